@@ -0,0 +1,218 @@
+from __future__ import print_function
+
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import numpy as np
+import multiprocessing
+
+import A2_Genetic_Salesman as tsp
+
+try:
+	import resource
+except ImportError:
+	resource = None
+
+# benchmarks the TSG_* algorithms on seeded random instances and TSPLIB files, e.g.
+#	python A2_Benchmark.py --sizes 50 1000 --seconds 5 --output results.json
+# and writes the generations and evaluations per second, peak memory and gap to a
+# reference tour of every run to a json (or csv) file, so versions can be compared
+
+# the algorithms that can be benchmarked
+VARIANTS = ("TSG_Truncation_OC", "TSG_Roulette_OC", "TSG_Truncation_Twin", "TSG_Roulette_Twin")
+
+# instances with more cities than this use a CityIndex rather than a full distance matrix
+DENSE_CITIES = 5000
+
+# returns n cities placed uniformly at random in a 1000 x 1000 square
+def uniformInstance(n, seed):
+	return np.random.RandomState(seed).uniform(0, 1000, (n, 2))
+
+# returns n cities in clusters, each city normally distributed around one of a number
+# of uniformly placed centres, as in the DIMACS TSP challenge's clustered instances
+def clusteredInstance(n, seed, clusters=0):
+	generator = np.random.RandomState(seed)
+	clusters = clusters or max(1, n // 100)
+	centres = generator.uniform(0, 1000, (clusters, 2))
+
+	return centres[generator.randint(0, clusters, n)] + generator.normal(0, 1000 / np.sqrt(n), (n, 2))
+
+# returns the distances, locations and name of an instance, given as ("uniform", n, seed),
+# ("clustered", n, seed) or ("tsplib", path)
+def loadInstance(instance):
+	if instance[0] == "tsplib":
+		distances, locations, header = tsp.readTSPLIB(instance[1])
+		return distances, locations, header.get("NAME", os.path.basename(instance[1]))
+
+	kind, n, seed = instance
+	locations = uniformInstance(n, seed) if kind == "uniform" else clusteredInstance(n, seed)
+	distances = tsp.getDistances(locations, candidates=10 if n > DENSE_CITIES else 0)
+
+	return distances, locations, "%s-%d-%d" % (kind, n, seed)
+
+# returns the length of a reference tour for an instance: the known optimum's if a
+# TSPLIB instance has an .opt.tour file next to it, otherwise a greedy edge tour
+# improved by local search for up to seconds seconds
+def referenceLength(args):
+	instance, seconds = args
+	distances, locations, name = loadInstance(instance)
+
+	if instance[0] == "tsplib":
+		tourPath = os.path.splitext(instance[1])[0] + ".opt.tour"
+		if os.path.exists(tourPath):
+			return {"reference": evaluateTour(tsp.readTSPLIBTour(tourPath), distances), "referenceTour": "optimal"}
+
+	neighbours = tsp.getNeighbours(distances)
+	tour = tsp.greedyEdgeTour(distances, locations, 0, 1)
+	tour, change = tsp.localSearch(tour, distances, neighbours, deadline=time.time() + seconds)
+
+	return {"reference": evaluateTour(tour, distances), "referenceTour": "greedy+2opt"}
+
+def evaluateTour(tour, distances):
+	return float(tsp.evaluatePopulation([tour], distances)[0])
+
+# returns the most memory this process has used so far in MB, or None where the
+# resource module isn't available
+def peakMemory():
+	if resource is None:
+		return None
+
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+# runs one algorithm on one instance. the per-generation telemetry of the run gives the
+# evaluations and the time spent in each stage, and generations and evaluations per
+# second are taken over the time spent in the stages, not the telemetry itself
+def benchmarkRun(args):
+	variant, instance, seed, numEntries, numGenerations, seconds, mod = args
+	distances, locations, name = loadInstance(instance)
+
+	random.seed(seed)
+	np.random.seed(seed % 2**32)
+
+	records = []
+	start = time.time()
+	bestPath, distance, gensTaken = getattr(tsp, variant)(numEntries, len(distances), distances, numGenerations, 0, mod,
+		timeLimit=seconds, telemetry=records.append)
+	wallSeconds = time.time() - start
+
+	stages = {}
+	for stage in ("selection", "crossover", "mutation", "search", "evaluation"):
+		stages[stage] = sum(record[stage] for record in records)
+	stageSeconds = max(sum(stages.values()), 1e-9)
+	evaluations = sum(record["evaluations"] for record in records)
+
+	result = {
+		"variant": variant,
+		"instance": name,
+		"cities": len(distances),
+		"seed": seed,
+		"numEntries": numEntries,
+		"generations": len(records),
+		"evaluations": evaluations,
+		"seconds": wallSeconds,
+		"gensPerSecond": len(records) / stageSeconds,
+		"evalsPerSecond": evaluations / stageSeconds,
+		"distance": float(distance),
+		"peakRSSMB": peakMemory()}
+
+	for stage in stages:
+		result[stage + "Seconds"] = stages[stage]
+
+	return result
+
+# runs every variant on every instance with seeds different seeds and returns the results.
+# each run is made in a fresh process so its peak memory is its own, one at a time unless
+# processes says otherwise, as runs sharing cores would skew each other's timings
+def runSuite(instances, variants=VARIANTS, seeds=1, numEntries=50, numGenerations=1000, seconds=10, mod=10,
+		referenceSeconds=60, processes=1, seed=0):
+	pool = multiprocessing.Pool(processes, maxtasksperchild=1)
+	try:
+		references = pool.map(referenceLength, [(instance, referenceSeconds) for instance in instances], chunksize=1)
+
+		runs = []
+		for instance in instances:
+			for variant in variants:
+				for i in range(0, seeds):
+					runs.append((variant, instance, seed + i, numEntries, numGenerations, seconds, mod))
+		results = pool.map(benchmarkRun, runs, chunksize=1)
+	finally:
+		pool.close()
+		pool.join()
+
+	for run, result in zip(runs, results):
+		result.update(references[instances.index(run[1])])
+		result["gap"] = result["distance"] / result["reference"] - 1
+
+	return results
+
+# returns what the results were measured with, so results from different versions and
+# machines can be told apart
+def environment():
+	try:
+		with open(os.devnull, "w") as devnull:
+			commit = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+				stderr=devnull).decode("ascii").strip()
+	except (OSError, subprocess.CalledProcessError):
+		commit = None
+
+	return {
+		"commit": commit,
+		"time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+		"python": platform.python_version(),
+		"numpy": np.__version__,
+		"platform": platform.platform(),
+		"processor": platform.processor(),
+		"cpus": multiprocessing.cpu_count()}
+
+# writes the results to a json file along with the environment, or to a csv file one row
+# a run when outputPath ends in .csv
+def writeResults(outputPath, results, settings):
+	if outputPath.endswith(".csv"):
+		columns = sorted(set(key for result in results for key in result))
+		with open(outputPath, "w") as output:
+			writer = csv.writer(output)
+			writer.writerow(columns)
+			for result in results:
+				writer.writerow([result.get(column) for column in columns])
+		return
+
+	with open(outputPath, "w") as output:
+		json.dump({"environment": environment(), "settings": settings, "results": results}, output, indent=1)
+
+def main():
+	parser = argparse.ArgumentParser(description="Benchmark the genetic TSP algorithms")
+	parser.add_argument("--sizes", type=int, nargs="*", default=[50, 200, 1000, 5000, 50000])
+	parser.add_argument("--kinds", nargs="*", default=["uniform", "clustered"], choices=["uniform", "clustered"])
+	parser.add_argument("--tsplib", nargs="*", default=[], help="TSPLIB .tsp files to run as well")
+	parser.add_argument("--variants", nargs="*", default=list(VARIANTS), choices=VARIANTS)
+	parser.add_argument("--seeds", type=int, default=1, help="runs of each variant on each instance")
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--population", type=int, default=50)
+	parser.add_argument("--generations", type=int, default=1000)
+	parser.add_argument("--seconds", type=float, default=10, help="time limit of each run")
+	parser.add_argument("--mod", type=int, default=10)
+	parser.add_argument("--reference-seconds", type=float, default=60)
+	parser.add_argument("--processes", type=int, default=1)
+	parser.add_argument("--output", default="benchmark.json")
+	args = parser.parse_args()
+
+	instances = [(kind, n, args.seed) for n in args.sizes for kind in args.kinds]
+	instances += [("tsplib", path) for path in args.tsplib]
+
+	results = runSuite(instances, args.variants, args.seeds, args.population, args.generations, args.seconds,
+		args.mod, args.reference_seconds, args.processes, args.seed)
+	writeResults(args.output, results, vars(args))
+
+	for result in results:
+		print(result["variant"], result["instance"], "%.1f gens/s" % result["gensPerSecond"],
+			"%.0f evals/s" % result["evalsPerSecond"], "gap %.1f%%" % (100 * result["gap"]))
+
+if __name__ == "__main__":
+	main()
\ No newline at end of file
@@ -1,80 +1,962 @@
+from __future__ import print_function
 
 import random 
-import matplotlib.pyplot as plt
 import numpy as np
 import math
+import multiprocessing
+import time
+import csv
+import hashlib
+import json
+import os
+import struct
+import traceback
+import weakref
+
+try:
+	from queue import Empty
+except ImportError:
+	from Queue import Empty
+
+# returns a hashable key for a member so duplicates can be found with a set
+# lookup instead of scanning the population. when canonical is set, every
+# rotation and reversal of a tour gives the same key since they are the same loop
+def tourKey(member, canonical=False):
+	if isinstance(member, np.ndarray):
+		member = member.tolist()
+
+	if not canonical:
+		return tuple(member)
+
+	# rotate so the lowest city comes first
+	start = member.index(min(member))
+	rotated = list(member[start:]) + list(member[:start])
+
+	# then travel in whichever direction visits the lower neighbour first
+	if len(rotated) > 2 and rotated[-1] < rotated[1]:
+		rotated = rotated[:1] + rotated[:0:-1]
+
+	return tuple(rotated)
+
+# cities above this many are seeded over a pool of processes when initialize's processes is 0
+SEED_PARALLEL_CITIES = 2000
 
 # returns random list of integers, non repeating, within the range
-# to represent members of the population
-def initialize(numEntries, sizeEntries):
+# to represent members of the population. seeding builds some members with the
+# heuristics in SEEDINGS instead, mapping their names to the share of the population
+# each one builds, e.g. {"nearest": 0.2, "greedy": 0.05}. they need the distances, and
+# "curve" the locations of the cities too. tours that come out the same are only kept
+# once and random members make up the rest. seeded tours are built over processes
+# processes, by default one per core once there are more than SEED_PARALLEL_CITIES cities
+def initialize(numEntries, sizeEntries, canonical=False, seeding=None, distances=None, locations=None, processes=0):
 	population = []
+	keys = set()
 
-	# loop numEntries times and add unique random integers to each index
-	for i in range (0, numEntries):
+	for member in seedTours(numEntries, sizeEntries, seeding, distances, locations, processes):
+		key = tourKey(member, canonical)
+
+		if key not in keys and len(population) < numEntries:
+			keys.add(key)
+			population.append(member)
+
+	# loop until there are numEntries members and add unique random integers to each index
+	for i in range (len(population), numEntries):
 
 		# while True + break is like do while loop
 		while True:
 		    member = random.sample(range(0, sizeEntries), sizeEntries)
+		    key = tourKey(member, canonical)
 
-		    if member not in population:
+		    if key not in keys:
+		    	keys.add(key)
 		    	population.append(member)
 		    	break
 
 	return population
 
+# returns the tours initialize builds with heuristics
+def seedTours(numEntries, sizeEntries, seeding, distances, locations, processes):
+	if not seeding:
+		return []
+
+	tasks = []
+	for name in sorted(seeding):
+		if name not in SEEDINGS:
+			raise ValueError("unknown seeding " + str(name))
+
+		count = int(round(seeding[name] * numEntries))
+		tasks.extend((name, variant, count) for variant in range(count))
+
+	if processes == 0:
+		processes = multiprocessing.cpu_count() if sizeEntries > SEED_PARALLEL_CITIES else 1
+
+	if processes == 1 or len(tasks) < 2:
+		distances, locations = seedingProblem(distances, sizeEntries, locations)
+		return [SEEDINGS[name](distances, locations, variant, count) for name, variant, count in tasks]
+
+	# the problem is handed to each worker once rather than with every task
+	pool = multiprocessing.Pool(min(processes, len(tasks)), seedWorker, (distances, sizeEntries, locations))
+	try:
+		return pool.map(seedTour, tasks)
+	finally:
+		pool.close()
+		pool.join()
+
+# returns the distances and locations of the first sizeEntries cities ready to seed from
+def seedingProblem(distances, sizeEntries, locations):
+	distances = toDistanceMatrix(openDistances(distances))
+	if sizeEntries < len(distances):
+		distances = distances[:sizeEntries, :sizeEntries]
+
+	if locations is not None:
+		locations = np.asarray(locations, dtype=np.float64)[:sizeEntries]
+
+	return distances, locations
+
+# the problem seedTour works on in a worker process, set up by seedWorker
+seedProblem = None
+
+def seedWorker(distances, sizeEntries, locations):
+	global seedProblem
+	seedProblem = seedingProblem(distances, sizeEntries, locations)
+
+# builds one seeded tour in a worker process
+def seedTour(task):
+	name, variant, count = task
+	distances, locations = seedProblem
+
+	return SEEDINGS[name](distances, locations, variant, count)
+
+# returns the distance from city to every city
+def cityDistances(distances, city):
+	if isinstance(distances, np.ndarray):
+		return distances[city]
+
+	return distances.gather(np.full(len(distances), city, dtype=np.intp), np.arange(len(distances)))
+
+# builds a tour by always going to the closest city not yet visited, starting from
+# one of count cities spread evenly through the city numbers
+def nearestNeighbourTour(distances, locations, variant, count):
+	n = len(distances)
+	city = variant * n // max(count, 1)
+	visited = np.zeros(n, dtype=bool)
+	visited[city] = True
+	tour = [city]
+
+	for i in range(1, n):
+		city = int(np.argmin(np.where(visited, np.inf, cityDistances(distances, city))))
+		visited[city] = True
+		tour.append(city)
+
+	return tour
+
+# builds a tour from the shortest edges first, skipping any that would give a city a
+# third edge or close a loop early. only the edges to each city's 10 nearest neighbours
+# are tried and the pieces left over are joined up nearest first. variants after the
+# first lengthen every edge by up to 10% at random so they pick slightly different ones
+def greedyEdgeTour(distances, locations, variant, count):
+	n = len(distances)
+	neighbours = np.array(getNeighbours(distances, 10), dtype=np.intp).reshape(n, -1)
+	a = np.repeat(np.arange(n), neighbours.shape[1])
+	b = neighbours.ravel()
+
+	lengths = gatherDistances(distances, a, b).astype(np.float64)
+	if variant:
+		lengths *= 1 + 0.1 * np.random.RandomState(variant).random_sample(len(lengths))
+
+	links = [[] for i in range(n)]
+	roots = list(range(n))
+
+	for edge in np.argsort(lengths, kind="mergesort"):
+		x, y = int(a[edge]), int(b[edge])
+		if len(links[x]) > 1 or len(links[y]) > 1:
+			continue
+
+		# the cities' pieces are tracked with union find, joining one to itself would close a loop
+		rootX, rootY = findRoot(roots, x), findRoot(roots, y)
+		if rootX == rootY:
+			continue
+
+		roots[rootX] = rootY
+		links[x].append(y)
+		links[y].append(x)
+
+	return joinFragments(distances, links)
+
+# returns the root of city's set in a union find, halving the path to it on the way
+def findRoot(roots, city):
+	while roots[city] != city:
+		roots[city] = roots[roots[city]]
+		city = roots[city]
+
+	return city
+
+# joins paths, given as each city's links to the cities next to it, into one tour by
+# walking each path to its end then jumping to the closest end of a path not yet walked
+def joinFragments(distances, links):
+	n = len(links)
+	ends = np.array([len(linked) < 2 for linked in links])
+	visited = np.zeros(n, dtype=bool)
+	tour = []
+	city = int(np.argmax(ends))
+
+	while True:
+		while True:
+			visited[city] = True
+			tour.append(city)
+
+			following = [other for other in links[city] if not visited[other]]
+			if not following:
+				break
+			city = following[0]
+
+		if len(tour) == n:
+			return tour
+
+		city = int(np.argmin(np.where(ends & ~visited, cityDistances(distances, city), np.inf)))
+
+# orders the cities along a Hilbert curve through their locations, so cities close
+# together on the curve are close together on the map. the variants flip and turn
+# the curve, giving up to 8 different tours
+def curveTour(distances, locations, variant, count):
+	if locations is None:
+		raise ValueError("curve seeding needs the locations of the cities")
+
+	points = locations - locations.min(axis=0)
+	if variant & 1:
+		points = points[:, ::-1].copy()
+	if variant & 2:
+		points[:, 0] = points[:, 0].max() - points[:, 0]
+	if variant & 4:
+		points[:, 1] = points[:, 1].max() - points[:, 1]
+
+	scaled = (points * ((2**16 - 1) / max(float(points.max()), 1e-9))).astype(np.int64)
+	return np.argsort(hilbertIndex(scaled[:, 0], scaled[:, 1], 16), kind="mergesort").tolist()
+
+# returns the position of each point along a Hilbert curve filling a 2^order square
+def hilbertIndex(x, y, order):
+	side = 2**order
+	index = np.zeros(len(x), dtype=np.int64)
+
+	s = side // 2
+	while s > 0:
+		rx = ((x & s) > 0).astype(np.int64)
+		ry = ((y & s) > 0).astype(np.int64)
+		index += s * s * ((3 * rx) ^ ry)
+
+		# turn the quadrant so the curve inside it lines up with the rest
+		flip = (ry == 0) & (rx == 1)
+		x = np.where(flip, side - 1 - x, x)
+		y = np.where(flip, side - 1 - y, y)
+		turn = ry == 0
+		x, y = np.where(turn, y, x), np.where(turn, x, y)
+		s //= 2
+
+	return index
+
+# a quicker Christofides: a minimum spanning tree, its odd degree cities paired off
+# greedily (each with the closest one left rather than the best matching overall) and
+# walked as an Euler tour, skipping cities already visited. variants pair the cities
+# off in a different random order
+def christofidesTour(distances, locations, variant, count):
+	n = len(distances)
+	links = [[] for i in range(n)]
+
+	# Prim's algorithm, adding the city closest to the tree one at a time
+	inTree = np.zeros(n, dtype=bool)
+	inTree[0] = True
+	closest = np.array(cityDistances(distances, 0), dtype=np.float64)
+	closest[0] = np.inf
+	via = np.zeros(n, dtype=np.intp)
+
+	for i in range(1, n):
+		city = int(np.argmin(closest))
+		inTree[city] = True
+		links[city].append(int(via[city]))
+		links[via[city]].append(city)
+
+		row = cityDistances(distances, city)
+		nearer = ~inTree & (row < closest)
+		closest[nearer] = row[nearer]
+		via[nearer] = city
+		closest[city] = np.inf
+
+	odd = [city for city in range(n) if len(links[city]) % 2]
+	if variant:
+		np.random.RandomState(variant).shuffle(odd)
+
+	unmatched = np.zeros(n, dtype=bool)
+	unmatched[odd] = True
+	for city in odd:
+		if unmatched[city]:
+			unmatched[city] = False
+			other = int(np.argmin(np.where(unmatched, cityDistances(distances, city), np.inf)))
+			unmatched[other] = False
+			links[city].append(other)
+			links[other].append(city)
+
+	# Hierholzer's algorithm, every city now has an even number of edges
+	stack = [0]
+	walk = []
+	while stack:
+		city = stack[-1]
+		if links[city]:
+			other = links[city].pop()
+			links[other].remove(city)
+			stack.append(other)
+		else:
+			walk.append(stack.pop())
+
+	visited = bytearray(n)
+	tour = []
+	for city in walk:
+		if not visited[city]:
+			visited[city] = 1
+			tour.append(city)
+
+	return tour
+
+# the heuristics initialize can seed members with, each called as
+# seed(distances, locations, variant, count) to build the variant'th of count tours
+SEEDINGS = {
+	"nearest": nearestNeighbourTour,
+	"greedy": greedyEdgeTour,
+	"curve": curveTour,
+	"christofides": christofidesTour}
+
 # returns the total distance of a member 
 def evaluate(member, distances):
-	totalDistance = 0;
+	return 1.0/sum(edgeLengths(member, distances))
+
+# returns the distance of every step of a member's path, the last one being the
+# distance from the last stop back to the start. numpy distances are indexed with
+# the whole path at once, a list of lists is walked city by city
+def edgeLengths(member, distances):
+	if isinstance(distances, (np.ndarray, CityIndex, SymmetricDistances)):
+		tour = np.asarray(member, dtype=np.intp)
+		following = np.empty_like(tour)
+		following[:-1] = tour[1:]
+		following[-1] = tour[0]
+		return gatherDistances(distances, tour, following)
+
+	lengths = []
+	for i in range(0, len(member)):
+		lengths.append(distances[member[i - 1]][member[i]])
+
+	# the loop above starts with the step back to the start, move it to the end
+	return lengths[1:] + lengths[:1]
+
+# returns the distances between each pair of cities in two arrays of the same shape
+def gatherDistances(distances, a, b):
+	if isinstance(distances, np.ndarray):
+		return distances[a, b]
+
+	return distances.gather(a, b)
+
+# returns the distances as a numpy matrix so whole populations can be
+# scored with a single gather instead of a python loop per city
+def toDistanceMatrix(distances):
+	if isinstance(distances, (np.ndarray, CityIndex, SymmetricDistances)):
+		return distances
+
+	return np.asarray(distances, dtype=np.float64)
+
+# returns the population as an (N x n) integer array, one row per member
+def toPopulationArray(population):
+	if isinstance(population, np.ndarray) and population.dtype.kind in "iu":
+		return population
+
+	return np.asarray(population, dtype=np.intp)
+
+# returns the total distance of every member of the population at once.
+# each row is paired with itself rolled by one city so the last column
+# holds the distance from the final stop back to the start
+def evaluatePopulation(population, distances):
+	tours = toPopulationArray(population)
+
+	return gatherDistances(toDistanceMatrix(distances), tours, np.roll(tours, -1, axis=1)).sum(axis=1)
+
+# how many of each member's shortest steps a Population keeps track of
+EDGE_STATS = 3
+
+# returns the total distance of every member of the population, as evaluatePopulation
+# does, along with the positions and distances of each member's k shortest steps from
+# the same gather, shortest first. step p goes from the city at p to the one at p + 1,
+# the step back to the start isn't counted (see findShortestdistance)
+def tourStats(population, distances, k=EDGE_STATS):
+	tours = toPopulationArray(population)
+	steps = gatherDistances(toDistanceMatrix(distances), tours, np.roll(tours, -1, axis=1))
+	positions, shortest = shortestOfSteps(steps, k)
+
+	return steps.sum(axis=1), positions, shortest
+
+# returns the positions and distances of the k shortest steps of each row of steps, the
+# distance of every step of each tour, as tourStats does
+def shortestOfSteps(steps, k=EDGE_STATS):
+	inner = steps[:, :-1]
+	k = min(k, inner.shape[1])
+
+	if k == 0:
+		return np.zeros((len(steps), 0), dtype=np.intp), np.zeros((len(steps), 0))
+
+	# the k shortest in order of position, then sorted stably by distance so ties go to
+	# the earlier step as they do in findShortestdistance
+	rows = np.arange(len(steps))[:, None]
+	positions = np.sort(np.argpartition(inner, k - 1, axis=1)[:, :k], axis=1)
+	positions = positions[rows, np.argsort(inner[rows, positions], axis=1, kind="mergesort")]
+
+	return positions, inner[rows, positions]
+
+# a population of members that keeps the total distance of each member next
+# to it, so a member is only scored when it is added or changed. a count of
+# each member's tourKey is kept alongside so membership tests are a hash lookup.
+# members are stored as the rows of one preallocated integer array, of the smallest
+# type that holds the city numbers (see tourType) unless dtype is given, which only
+# grows if more than capacity members are added. population[i] is a view of row i,
+# population[i:j] a view of those rows and population.tour(i) a Tour that keeps the
+# member's distance up to date as it's changed. the drivers keep two populations and
+# select from one into the other each generation, so no arrays are allocated once both
+# have reached full size. the shortest member ever scored is kept in bestLength and
+# bestTour as members are scored or changed, and is passed on to the populations
+# selected from this one. the positions and distances of each member's EDGE_STATS
+# shortest steps are recorded when it's scored and kept up to date by swap, so the
+# crossovers can look them up with shortestStep rather than walking the member.
+# evaluations counts the members whose distances have been worked out in full. each
+# row's tourKey is kept in rowKeys, so selecting members reuses their keys rather than
+# building them again
+class Population(object):
+
+	__slots__ = ("distances", "canonical", "capacity", "dtype", "size", "tours", "lengths", "scored", "keys",
+		"rowKeys", "bestLength", "bestTour", "stepPositions", "stepLengths", "stepCounts", "evaluations")
+
+	def __init__(self, distances, members=None, canonical=False, capacity=0, dtype=None):
+		self.distances = toDistanceMatrix(distances)
+		self.canonical = canonical
+		self.capacity = capacity
+		self.dtype = dtype
+		self.size = 0
+		self.tours = None
+		self.lengths = np.zeros(capacity)
+		self.scored = np.zeros(capacity, dtype=bool)
+		self.stepPositions = np.zeros((capacity, EDGE_STATS), dtype=np.intp)
+		self.stepLengths = np.zeros((capacity, EDGE_STATS))
+		self.stepCounts = np.zeros(capacity, dtype=np.int8)
+		self.keys = {}
+		self.rowKeys = np.empty(capacity, dtype=object)
+		self.bestLength = float("inf")
+		self.bestTour = None
+		self.evaluations = 0
+
+		if members is not None:
+			for member in members:
+				self.append(member)
+
+	def __len__(self):
+		return self.size
+
+	def __getitem__(self, i):
+		if isinstance(i, slice):
+			return self.tours[:self.size][i]
+		if i >= self.size or i < -self.size:
+			raise IndexError("population index out of range")
+
+		return self.tours[i % self.size]
+
+	def tour(self, i):
+		return Tour(self, i % self.size)
+
+	def __iter__(self):
+		return iter(self.tours[:self.size])
+
+	def __contains__(self, member):
+		return tourKey(member, self.canonical) in self.keys
+
+	# counts the key of member, the member at row i
+	def addKey(self, i, member):
+		key = tourKey(member, self.canonical)
+		self.rowKeys[i] = key
+		self.keys[key] = self.keys.get(key, 0) + 1
+
+	def removeKey(self, i):
+		key = self.rowKeys[i]
+		if self.keys[key] == 1:
+			del self.keys[key]
+		else:
+			self.keys[key] -= 1
 
-	# add the distances between each city on the path
-	for i in range(0, len(member) - 1):
+	# keeps a copy of member if it's the shortest seen so far
+	def noteBest(self, length, member):
+		if length < self.bestLength:
+			self.bestLength = float(length)
+			self.bestTour = np.array(member)
 
-		x = distances[member[i]][member[i + 1]]
-		totalDistance += x
+	# makes room for at least size members of sizeEntries cities
+	def reserve(self, size, sizeEntries):
+		if self.tours is not None and size <= self.capacity:
+			return
 
-	# distance from last stop back to start
-	totalDistance += distances[member[-1:][0]][ member[0]]
-	return 1.0/totalDistance
+		if self.tours is None:
+			capacity = max(size, self.capacity, 16)
+		else:
+			capacity = max(size, self.capacity * 2)
+		tours = np.zeros((capacity, sizeEntries), dtype=self.dtype or tourType(sizeEntries))
+		lengths = np.zeros(capacity)
+		scored = np.zeros(capacity, dtype=bool)
+		stepPositions = np.zeros((capacity, EDGE_STATS), dtype=np.intp)
+		stepLengths = np.zeros((capacity, EDGE_STATS))
+		stepCounts = np.zeros(capacity, dtype=np.int8)
+		rowKeys = np.empty(capacity, dtype=object)
+
+		if self.tours is not None:
+			tours[:self.size] = self.tours[:self.size]
+		lengths[:self.size] = self.lengths[:self.size]
+		scored[:self.size] = self.scored[:self.size]
+		stepPositions[:self.size] = self.stepPositions[:self.size]
+		stepLengths[:self.size] = self.stepLengths[:self.size]
+		stepCounts[:self.size] = self.stepCounts[:self.size]
+		rowKeys[:self.size] = self.rowKeys[:self.size]
+
+		self.tours, self.lengths, self.scored, self.capacity = tours, lengths, scored, capacity
+		self.stepPositions, self.stepLengths, self.stepCounts = stepPositions, stepLengths, stepCounts
+		self.rowKeys = rowKeys
+
+	# empties the population, keeping its arrays for the next members
+	def clear(self):
+		self.size = 0
+		self.keys.clear()
+
+	# adds a member to the population, if its distance isn't known it is
+	# scored along with any other new members the next time it's needed
+	def append(self, member, length=None):
+		self.reserve(self.size + 1, len(member))
+
+		self.addKey(self.size, member)
+		self.tours[self.size] = member
+		self.lengths[self.size] = 0 if length is None else length
+		self.scored[self.size] = length is not None
+		self.stepCounts[self.size] = 0
+		self.size += 1
+
+		if length is not None:
+			self.noteBest(length, member)
+
+	# returns the total distance of every member, new members are all
+	# scored together in one vectorized pass
+	def score(self):
+		unscored = np.flatnonzero(~self.scored[:self.size])
+
+		if len(unscored):
+			lengths, positions, shortest = tourStats(self.tours[unscored], self.distances)
+			self.evaluations += len(unscored)
+			self.setScores(unscored, lengths)
+			self.setSteps(unscored, positions, shortest)
+
+		return self.lengths[:self.size]
+
+	# records the distances of the members at rows, worked out elsewhere. their shortest
+	# steps are worked out again when they're next asked for
+	def setScores(self, rows, lengths):
+		self.lengths[rows] = lengths
+		self.scored[rows] = True
+		self.stepCounts[rows] = 0
+
+		if len(rows):
+			i = np.argmin(lengths)
+			self.noteBest(lengths[i], self.tours[rows[i]])
+
+	# records the positions and distances of the shortest steps of the members at rows,
+	# as returned by tourStats
+	def setSteps(self, rows, positions, lengths):
+		k = positions.shape[1]
+		self.stepPositions[rows, :k] = positions
+		self.stepLengths[rows, :k] = lengths
+		self.stepCounts[rows] = k
+
+	# returns the positions of the shortest steps of member i, shortest first, working
+	# them out only if the member was changed in a way they couldn't be kept up to date
+	def shortestSteps(self, i):
+		if self.stepCounts[i] == 0:
+			lengths, positions, shortest = tourStats(self.tours[i:i + 1], self.distances)
+			self.evaluations += 1
+			self.setSteps([i], positions, shortest)
+
+		return self.stepPositions[i, :self.stepCounts[i]]
+
+	# returns the positions of the two cities either side of member i's shortest step,
+	# as findShortestdistance does
+	def shortestStep(self, i):
+		a = int(self.shortestSteps(i)[0])
+		return a, a + 1
+
+	# updates the shortest steps kept for member i after the steps at positions changed.
+	# the steps kept that didn't change are still the shortest of those that didn't, so
+	# the ones that changed are merged in if they're no longer than the longest of them.
+	# if every step kept changed the rest aren't known, and are worked out when next needed
+	def updateSteps(self, i, positions):
+		member = self.tours[i]
+		count = self.stepCounts[i]
+		steps = [(self.stepLengths[i, j], self.stepPositions[i, j]) for j in range(0, count)
+			if self.stepPositions[i, j] not in positions]
+
+		if not steps:
+			self.stepCounts[i] = 0
+			return
+
+		longest = steps[-1][0]
+		for p in positions:
+			if p < len(member) - 1:
+				length = self.distances[member[p], member[p + 1]]
+				if length <= longest:
+					steps.append((length, p))
+
+		steps = sorted(steps)[:EDGE_STATS]
+		for j, (length, p) in enumerate(steps):
+			self.stepLengths[i, j] = length
+			self.stepPositions[i, j] = p
+		self.stepCounts[i] = len(steps)
+
+	# swaps two cities in a member and updates its distance using only
+	# the (at most four) edges touching the swapped cities
+	def swap(self, i, a, b):
+		member = self.tours[i]
+
+		if a == b:
+			return
+
+		self.removeKey(i)
+
+		if not self.scored[i]:
+			member[a], member[b] = member[b], member[a]
+			self.stepCounts[i] = 0
+			self.addKey(i, member)
+			return
+
+		n = len(member)
+		edges = set([(a - 1) % n, a, (b - 1) % n, b])
+
+		before = 0.0
+		for j in edges:
+			before += self.distances[member[j], member[(j + 1) % n]]
+
+		member[a], member[b] = member[b], member[a]
+
+		after = 0.0
+		for j in edges:
+			after += self.distances[member[j], member[(j + 1) % n]]
+
+		self.lengths[i] += after - before
+		self.updateSteps(i, edges)
+		self.addKey(i, member)
+		self.noteBest(self.lengths[i], member)
+
+	# swaps the cities at positions a[k] and b[k] of the member at rows[k], for every k at
+	# once, updating their distances and shortest steps from the (at most four) edges
+	# touching the swapped cities as swap does, with one gather before and one after
+	def swapRows(self, rows, a, b):
+		tours = self.tours[rows]
+		n = tours.shape[1]
+		lines = np.arange(len(rows))
+		edges = np.stack([a - 1, a, b - 1, b], axis=1) % n
+
+		# an edge touching both cities, when they're next to each other, is only counted once
+		first = np.ones(edges.shape, dtype=bool)
+		for k in range(1, 4):
+			first[:, k] = (edges[:, k:k + 1] != edges[:, :k]).all(axis=1)
+
+		before = (gatherDistances(self.distances, tours[lines[:, None], edges],
+			tours[lines[:, None], (edges + 1) % n]) * first).sum(axis=1)
+		tours[lines, a], tours[lines, b] = tours[lines, b], tours[lines, a]
+		after = (gatherDistances(self.distances, tours[lines[:, None], edges],
+			tours[lines[:, None], (edges + 1) % n]) * first).sum(axis=1)
+
+		for k, i in enumerate(rows):
+			self.removeKey(i)
+			self.addKey(i, tours[k])
+		self.tours[rows] = tours
+		self.lengths[rows] += after - before
+
+		scored = self.scored[rows]
+		for k, i in enumerate(rows):
+			if scored[k]:
+				self.updateSteps(i, set(edges[k][first[k]].tolist()))
+			else:
+				self.stepCounts[i] = 0
+
+		if scored.any():
+			k = np.flatnonzero(scored)[np.argmin(self.lengths[rows[scored]])]
+			self.noteBest(self.lengths[rows[k]], tours[k])
+
+	# reverses the cities from position a to b of a member and updates its distance
+	# from the edges along the reversed stretch. the steps inside the stretch move, so
+	# its shortest steps are worked out again when they're next asked for
+	def reverse(self, i, a, b):
+		member = self.tours[i]
+
+		if a >= b:
+			return
+
+		self.removeKey(i)
+
+		self.stepCounts[i] = 0
+
+		if not self.scored[i]:
+			member[a:b + 1] = member[a:b + 1][::-1].copy()
+			self.addKey(i, member)
+			return
+
+		n = len(member)
+		edges = np.arange(a - 1, b + 1) % n
+		before = gatherDistances(self.distances, member[edges], member[(edges + 1) % n]).sum()
+
+		member[a:b + 1] = member[a:b + 1][::-1].copy()
+
+		after = gatherDistances(self.distances, member[edges], member[(edges + 1) % n]).sum()
+
+		self.lengths[i] += after - before
+		self.addKey(i, member)
+		self.noteBest(self.lengths[i], member)
+
+	# returns the length of the shortest path and the index it appears in the population
+	def fittest(self):
+		totals = self.score()
+		lowestI = int(np.argmin(totals))
+
+		return float(totals[lowestI]), lowestI
+
+	# returns a population made of copies of the members at the given indices, their
+	# distances carried over rather than recomputed. the members are copied into out
+	# if it's given, reusing its arrays, otherwise into a new population
+	def select(self, indices, out=None):
+		if out is None:
+			out = Population(self.distances, canonical=self.canonical, capacity=len(indices))
+
+		totals = self.score()
+		size = len(indices)
+
+		out.clear()
+		out.reserve(size, self.tours.shape[1])
+		out.bestLength, out.bestTour = self.bestLength, self.bestTour
+		np.take(self.tours, indices, axis=0, out=out.tours[:size])
+		np.take(totals, indices, out=out.lengths[:size])
+		np.take(self.stepPositions, indices, axis=0, out=out.stepPositions[:size])
+		np.take(self.stepLengths, indices, axis=0, out=out.stepLengths[:size])
+		np.take(self.stepCounts, indices, out=out.stepCounts[:size])
+		out.scored[:size] = True
+		out.size = size
+
+		np.take(self.rowKeys, indices, out=out.rowKeys[:size])
+		for key in out.rowKeys[:size]:
+			out.keys[key] = out.keys.get(key, 0) + 1
+
+		return out
+
+	# puts a new member in place of the one at index i
+	def replace(self, i, member, length=None):
+		self.removeKey(i)
+		self.addKey(i, member)
+		self.tours[i] = member
+		self.lengths[i] = 0 if length is None else length
+		self.scored[i] = length is not None
+		self.stepCounts[i] = 0
+
+		if length is not None:
+			self.noteBest(length, member)
+
+	# puts the rows of tours in place of the members at indices, with their distances
+	def replaceRows(self, indices, tours, lengths):
+		for i, member in zip(indices, tours):
+			self.removeKey(i)
+			self.addKey(i, member)
+
+		self.tours[indices] = tours
+		self.lengths[indices] = lengths
+		self.scored[indices] = True
+		self.stepCounts[indices] = 0
+
+		if len(indices):
+			i = np.argmin(lengths)
+			self.noteBest(lengths[i], tours[i])
+
+# returns the smallest integer type that holds the city numbers of an n city tour, so
+# a 1,000 city member takes 2KB rather than the 8KB of int64 or 28KB of a list of ints
+def tourType(n):
+	return np.uint16 if n <= 2**16 else np.int32
+
+# one member of a Population, which keeps its distance and key in the population up to
+# date when it's changed through swap or reverse. tour[i:j] is a view of those cities,
+# not a copy
+class Tour(object):
+
+	__slots__ = ("population", "row")
+
+	def __init__(self, population, row):
+		self.population = population
+		self.row = row
+
+	def __len__(self):
+		return self.population.tours.shape[1]
+
+	def __getitem__(self, key):
+		return self.population.tours[self.row][key]
+
+	def __iter__(self):
+		return iter(self.population.tours[self.row])
+
+	def tolist(self):
+		return self.population.tours[self.row].tolist()
+
+	def length(self):
+		return float(self.population.score()[self.row])
+
+	def swap(self, a, b):
+		self.population.swap(self.row, a, b)
+
+	def reverse(self, a, b):
+		self.population.reverse(self.row, a, b)
+
+# returns the population as a Population, scoring it if it is a plain list
+def asPopulation(population, distances):
+	if isinstance(population, Population):
+		return population
+
+	return Population(distances, population)
+
+# decides when a run has stopped getting anywhere. update is called once a generation and
+# returns True once any of these is met, with the reason left in reason:
+#	"stagnation"	- the best distance hasn't improved for patience generations
+#	"diversity"	- edgeEntropy of the population has fallen below minDiversity
+#	"deadline"	- timeLimit seconds have passed since the monitor was made
+# each of them is off when 0. diversity is measured over the first survivors members
+# (the selected ones, ahead of the offspring and random fill) or everyone if it's 0
+class ConvergenceMonitor(object):
+
+	def __init__(self, patience=0, minDiversity=0, timeLimit=0, survivors=0):
+		self.patience = patience
+		self.minDiversity = minDiversity
+		self.timeLimit = timeLimit
+		self.survivors = survivors
+		self.start = time.time()
+		self.bestLength = float("inf")
+		self.stale = 0
+		self.reason = None
+
+	def update(self, population):
+		if population.bestLength < self.bestLength:
+			self.bestLength = population.bestLength
+			self.stale = 0
+		else:
+			self.stale += 1
+
+		if self.patience != 0 and self.stale >= self.patience:
+			self.reason = "stagnation"
+		elif self.minDiversity != 0 and edgeEntropy(population, self.survivors) < self.minDiversity:
+			self.reason = "diversity"
+		elif self.timeLimit != 0 and time.time() - self.start >= self.timeLimit:
+			self.reason = "deadline"
+
+		return self.reason is not None
+
+# returns how spread out the edges used by the population are, from 0 when every member
+# is the same loop to 1 when the edges are spread as evenly as they can be (no two members
+# sharing an edge, or every possible edge used equally often). it is the entropy of how
+# often each edge is used, scaled between those two extremes. only the first count
+# members are looked at if count is given
+def edgeEntropy(population, count=0):
+	tours = toPopulationArray(population.tours[:len(population)] if isinstance(population, Population) else population)
+	if count != 0:
+		tours = tours[:count]
+	count, n = tours.shape
+	if count < 2:
+		return 0.0
+
+	a = tours
+	b = np.roll(tours, -1, axis=1)
+	edges = np.minimum(a, b).astype(np.int64) * n + np.maximum(a, b)
+	frequencies = np.unique(edges, return_counts=True)[1] / float(edges.size)
+	entropy = -(frequencies * np.log(frequencies)).sum()
+	highest = math.log(min(count * n, n * (n - 1) // 2))
+
+	if highest <= math.log(n):
+		return 0.0
+
+	return float((entropy - math.log(n)) / (highest - math.log(n)))
 
 # returns a sub-population of only those members whose total distances 
 # are below the population average
-def truncationSelect(population, distances, size):
-	fitnesses = []
-	newPopulation = []
+def truncationSelect(population, distances, size, out=None):
+	population = asPopulation(population, distances)
 
-	# populate with fitness heuristics
-	for i, fitness in enumerate(population):
-		fitnesses.append(evaluate(fitness, distances))
+	return population.select(truncationIndices(population, distances, size), out)
 
-	# sort population members based on associated fitness
-	population = [x for _,x in sorted(zip(fitnesses, population), reverse=True)]
+# returns the indices of the size shortest members, shortest first. only
+# the top size members are sorted, the rest are split off with a partition
+def truncationIndices(population, distances, size):
+	totals = asPopulation(population, distances).score()
 
-	for i in range(0, size):
-		newPopulation.append(population[i])
+	if size >= len(totals):
+		return np.argsort(totals, kind="mergesort")
 
-	return newPopulation
+	# partition so the size shortest members come first, then sort just those
+	best = np.argpartition(totals, size - 1)[:size]
+	return best[np.argsort(totals[best], kind="mergesort")]
 
 # ranomly selects members for the next generation but probability of 
-# being selected is weighted by fitness
-def rouletteSelect(population, distances, size):
-	total=0.0
+# being selected is weighted by fitness. sampling picks how the draws are made:
+#	"walk"	- draw a number and walk the cumulative probabilities to find it,
+#			  drawing again whenever an already selected member comes up
+#	"bisect"	- the same draws but found with a binary search of the prefix sums
+#	"keys"	- Efraimidis-Spirakis weighted sampling without replacement, every
+#			  member gets the key u^(1/fitness) and the highest keys are taken,
+#			  so size distinct members come out of one sort with no retries
+def rouletteSelect(population, distances, size, sampling="walk", out=None):
+	population = asPopulation(population, distances)
 	probabilities = [0]
-	newPopulation = []
-	fitnesses = []
+
+	# the selected members are copied into out if it's given
+	newPopulation = out
+	if newPopulation is None:
+		newPopulation = Population(population.distances, canonical=population.canonical, capacity=size)
+	newPopulation.clear()
+	newPopulation.bestLength, newPopulation.bestTour = population.bestLength, population.bestTour
+
+	# every member is scored once and reused for the elite and the probabilities
+	totals = population.score()
+	fitnesses = 1.0/totals
 
 	# selects fittest result automatically
-	a, b = getFittest(population, distances)
-	newPopulation.append(population[b])
+	a, b = population.fittest()
+	newPopulation.append(population[b], a)
+
+	if sampling == "keys":
+		# compare log(u)/fitness rather than u^(1/fitness) so small fitnesses don't underflow
+		keys = np.log(np.random.random_sample(len(population)))/(fitnesses/fitnesses.max())
+
+		for i in np.argsort(-keys):
+			if len(newPopulation) >= size:
+				break
+			if population[i] not in newPopulation:
+				newPopulation.append(population[i], totals[i])
+
+		return newPopulation
+
+	# add the totals
+	total = fitnesses.sum()
+
+	if sampling == "bisect":
+		prefixSums = np.cumsum(fitnesses/total)
 
-	# run evaluate on every member and add the totals
-	for i, member in enumerate(population):
-		x = evaluate(member, distances)
-		total += x
+		# draw as many as are still missing at once, repeats are dropped and redrawn
+		while len(newPopulation) < size:
+			draws = np.random.random_sample(size - len(newPopulation))
+			for i in np.searchsorted(prefixSums, draws, side="right"):
+				i = min(i, len(population) - 1)
+				if population[i] not in newPopulation:
+					newPopulation.append(population[i], totals[i])
+
+		return newPopulation
 
 	# get the probabilities 
-	for i, member in enumerate(population):
-		if i!=0 :
-			probabilities.append(probabilities[i-1] + evaluate(member, distances)/total)
+	probabilities.extend(np.cumsum(fitnesses[1:]/total).tolist())
 
 	# loop until newPopulation is filled 
 	while len(newPopulation) < size:
@@ -82,12 +964,12 @@ def rouletteSelect(population, distances, size):
 		for i, member in enumerate(population):
 			if (i >= len(population)-1):
 				if (member not in newPopulation):
-					newPopulation.append(member)
+					newPopulation.append(member, totals[i])
 				break
 
 			if (x >= probabilities[i] and x < probabilities[i+1]):
 				if (member not in newPopulation):
-					newPopulation.append(member)
+					newPopulation.append(member, totals[i])
 				break
 
 	return newPopulation
@@ -96,22 +978,23 @@ def rouletteSelect(population, distances, size):
 
 # just a readable format for testing
 def printPopulation(population, distances):
-	print "Population:"
+	print("Population:")
 	for i, member in enumerate (population):
-		print i, "-", member, evaluate(member, distances), 1.0/evaluate(member, distances)
+		print(i, "-", member, evaluate(member, distances), 1.0/evaluate(member, distances))
 
 # create a child for each member (with the next indexed member, 
 # less the final member) and add it to the population
-def twinCrossover(population, distances, sizeEntries):
+# the population is topped up with random members to offspring times its starting size
+def twinCrossover(population, distances, sizeEntries, offspring=3):
 	newPopulation = population
-	size = len(population) * 3
+	size = len(population) * offspring
 	# loop over members of population and create new members using each adjacent pair
 	for i in range(0, len(population) - 1):
 		
-		x = twinCombine(population[i], population[i + 1], distances)
+		x = twinCombine(population[i], population[i + 1], distances, shortestStep(population, i, distances))
 		if x not in newPopulation:
 			newPopulation.append(x)
-		x = twinCombine(population[i + 1], population[i], distances)
+		x = twinCombine(population[i + 1], population[i], distances, shortestStep(population, i + 1, distances))
 		if x not in newPopulation:
 			newPopulation.append(x)
 
@@ -123,28 +1006,44 @@ def twinCrossover(population, distances, sizeEntries):
 	return newPopulation
 
 
-def ocCrossover(population, distances, sizeEntries):
+# when neighbours (see getNeighbours) is given, gaps in a child are filled with
+# the nearest unused city to the one before it rather than a random one. the population
+# is topped up with random members to offspring times its starting size
+def ocCrossover(population, distances, sizeEntries, neighbours=None, offspring=2):
 	newPopulation = population
-	size = len(population) * 2
+	size = len(population) * offspring
 	for i in range(0, len(population) - 1):
-		a, b = findShortestdistance(population[i], distances)
-		c, d = findShortestdistance(population[i+1], distances)
+		a, b = shortestStep(population, i, distances)
+		c, d = shortestStep(population, i + 1, distances)
 
 		member = []
+		used = bytearray(len(population[i]))
+
+		# taking the next unused city from a shuffled list is the same as picking an
+		# unused city at random, without redrawing until one turns up
+		pool = random.sample(range(0, len(population[i])), len(population[i]))
+		k = 0
+
 		for j in range(0, len(population[i])):
 			if (j == a or j == b):
-				if population[i][j] not in member:
+				if not used[population[i][j]]:
 					member.append(population[i][j])
+					used[population[i][j]] = 1
 			if(j == c or j == d):
-				if population[i+1][j] not in member:
+				if not used[population[i+1][j]]:
 					member.append(population[i+1][j])
-			if (len(member) <= j):
-				while True:
-					x = random.randint(0, len(population[i])-1)
-
-					if x not in member:
+					used[population[i+1][j]] = 1
+			if (len(member) <= j and neighbours is not None and member):
+				for x in neighbours[member[-1]]:
+					if x < len(used) and not used[x]:
 						member.append(x)
+						used[x] = 1
 						break
+			if (len(member) <= j):
+				while used[pool[k]]:
+					k += 1
+				member.append(pool[k])
+				used[pool[k]] = 1
 
 
 		if member not in newPopulation:
@@ -157,10 +1056,125 @@ def ocCrossover(population, distances, sizeEntries):
 
 
 
-# returns the child of two members
-def twinCombine(parentOne, parentTwo, distances):
+# create two children for each adjacent pair of members using combine, one with each
+# parent first, then top the population up to offspring times its size with random members
+# as twinCrossover does. combine is one of the *Combine functions below
+def pairCrossover(population, distances, sizeEntries, combine, offspring=3):
+	newPopulation = population
+	size = len(population) * offspring
+
+	for i in range(0, len(population) - 1):
+		x = combine(population[i], population[i + 1], distances)
+		if x not in newPopulation:
+			newPopulation.append(x)
+		x = combine(population[i + 1], population[i], distances)
+		if x not in newPopulation:
+			newPopulation.append(x)
+
+	while (len(newPopulation) < size):
+		member = random.sample(range(0, sizeEntries), sizeEntries)
+		if member not in newPopulation:
+			newPopulation.append(member)
+
+	return newPopulation
+
+def oxCrossover(population, distances, sizeEntries, offspring=3):
+	return pairCrossover(population, distances, sizeEntries, oxCombine, offspring)
+
+def pmxCrossover(population, distances, sizeEntries, offspring=3):
+	return pairCrossover(population, distances, sizeEntries, pmxCombine, offspring)
+
+def erxCrossover(population, distances, sizeEntries, offspring=3):
+	return pairCrossover(population, distances, sizeEntries, erxCombine, offspring)
+
+# returns a random pair of cut points i < j
+def cutPoints(n):
+	i, j = sorted(random.sample(range(0, n + 1), 2))
+	return i, j
+
+# order crossover: the child keeps a random slice of the first parent in place and
+# takes the remaining cities in the order they come in the second parent, starting
+# after the slice
+def oxCombine(parentOne, parentTwo, distances=None):
+	n = len(parentOne)
+	i, j = cutPoints(n)
+	child = list(parentOne)
+	used = bytearray(n)
+	for city in parentOne[i:j]:
+		used[city] = 1
+
+	k = j % n
+	for x in range(j, j + n):
+		city = parentTwo[x % n]
+		if not used[city]:
+			child[k] = city
+			k = (k + 1) % n
+
+	return child
+
+# partially mapped crossover: the child starts as the second parent and takes a random
+# slice of the first parent in place, each city of the slice being swapped in from
+# wherever it was so the rest of the second parent's positions are kept where possible
+def pmxCombine(parentOne, parentTwo, distances=None):
+	i, j = cutPoints(len(parentOne))
+	child = list(parentTwo)
+	position = [0] * len(child)
+	for k, city in enumerate(child):
+		position[city] = k
+
+	for k in range(i, j):
+		city = parentOne[k]
+		x = position[city]
+		child[k], child[x] = city, child[k]
+		position[child[x]] = x
+		position[city] = k
+
+	return child
+
+# edge recombination: the child is built one city at a time, moving to a city that is
+# next to the current one in either parent. the one with the fewest parent edges left is
+# taken, then the closest, so the child is made almost entirely of parent edges. when no
+# parent edge is left the next unused city of a shuffled list is taken
+def erxCombine(parentOne, parentTwo, distances):
+	n = len(parentOne)
+	d = pairDistance(distances)
+
+	edges = [set() for city in range(0, n)]
+	for parent in (parentOne, parentTwo):
+		for k in range(0, n):
+			edges[parent[k]].add(parent[k - 1])
+			edges[parent[k]].add(parent[(k + 1) % n])
+
+	used = bytearray(n)
+	pool = random.sample(range(0, n), n)
+	k = 0
+
+	city = parentOne[0]
+	child = [city]
+	used[city] = 1
+
+	while len(child) < n:
+		for other in edges[city]:
+			edges[other].discard(city)
+
+		if edges[city]:
+			city = min(edges[city], key=lambda other: (len(edges[other]), d(city, other)))
+		else:
+			while used[pool[k]]:
+				k += 1
+			city = pool[k]
+
+		child.append(city)
+		used[city] = 1
+
+	return child
+
+
+# returns the child of two members. shortest is the pair findShortestdistance returns
+# for the first parent, if it's already known
+def twinCombine(parentOne, parentTwo, distances, shortest=None):
 	child = []
-	a, b = findShortestdistance(parentOne, distances)
+	a, b = shortest or findShortestdistance(parentOne, distances)
 	j = 0
 
 	# take two closest adjacent cities in the first parent, take them for the child
@@ -183,82 +1197,800 @@ def twinCombine(parentOne, parentTwo, distances):
 # return indices where a member's distance between two adjacent 
 # indices is shortest
 def findShortestdistance(member, distances):
-	a = 0
-	b = 1
-	shortest = distances[member[0]][member[1]]
+	# the step from the last city back to the start isn't a pair of adjacent indices
+	lengths = edgeLengths(member, distances)[:-1]
 
-	# loop over cities in member and find the shortest distance
-	for i in range(0, len(member) - 1):
-		x = distances[member[i]][member[i + 1]]
+	if isinstance(lengths, list):
+		a = lengths.index(min(lengths))
+	else:
+		a = int(np.argmin(lengths))
 
-		if x < shortest:
-			shortest = x
-			a = i
-			b = i + 1
+	return a, a + 1
 
-	return a, b
+# returns findShortestdistance of member i of the population, looked up in the steps a
+# Population keeps rather than walking the member
+def shortestStep(population, i, distances):
+	if isinstance(population, Population):
+		return population.shortestStep(i)
+
+	return findShortestdistance(population[i], distances)
+
+# the crossover operators by name, each called as crossover(population, distances, sizeEntries)
+CROSSOVERS = {
+	"twin": twinCrossover,
+	"oc": ocCrossover,
+	"ox": oxCrossover,
+	"pmx": pmxCrossover,
+	"erx": erxCrossover}
 
 # returns the population after selecting members at random and switching two values in each
-# introduces randomness to genetic algorithm
-def mutate(population, mod):
+# introduces randomness to genetic algorithm. when neighbours (see getNeighbours) is given
+# the city after the first one is swapped with one of its nearest neighbours instead, so
+# the swap puts two close cities next to each other
+def mutate(population, mod, neighbours=None, move="swap"):
 	#print population[0]
 	newPopulation = population
 	#print "!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!1"
 	if mod == 0:
 		mod = random.randint(1, 5)
 
-	x = []
-	for j in range(0, len(newPopulation[0])):
-		x.append(newPopulation[0][j])
-	y = False
-	
 	# loop over population and once every "mod" entries, swap the order of two random values
 	for i in range(5, len(newPopulation)):
-		for j in range(0, len(x)):
-			if x[j] != newPopulation[0][j]:
-				y = True
-		if (y):
-			#print "---->"
-			y = False
 		#print newPopulation[0], i
 		if i % mod == 0:
 			a = random.randint(0, len(newPopulation[i])-1)
 			b = random.randint(0, len(newPopulation[i])-1)
+			if neighbours is not None:
+				member = list(newPopulation[i])
+				city = random.choice(neighbours[member[a]])
+				if city < len(member):
+					a, b = (a + 1) % len(member), member.index(city)
+
+					# reversing from a to b joins the city before a to city, as 2-opt does,
+					# and when city comes first reversing from it up to that city does
+					if move == "inversion" and b < a:
+						a, b = b, a - 2
 			#print i, a, b
-			tmp = newPopulation[i][a]
-			newPopulation[i][a] = newPopulation[i][b]
-			newPopulation[i][b] = tmp
+			if isinstance(newPopulation, Population) and move == "inversion":
+				newPopulation.tour(i).reverse(min(a, b), max(a, b))
+			elif isinstance(newPopulation, Population):
+				newPopulation.swap(i, a, b)
+			else:
+				tmp = newPopulation[i][a]
+				newPopulation[i][a] = newPopulation[i][b]
+				newPopulation[i][b] = tmp
 	#print "!!!!!!!!!!!!!!!!!!!!!!!!!!!"
 	return newPopulation
 
+# the moves mutatePopulation can make, "mixed" picks one of them at random for each member
+MUTATIONS = ("swap", "inversion", "scramble")
 
-# returns the length of the shortest path and the index it appears in the population
-def getFittest(population, distances):
-	lowest = 1.0/evaluate(population[0], distances)
-	lowestI = 0
+# mutates a random selection of members all at once, each member after the first 5 being
+# picked with a chance of 1 in mod. move is one of MUTATIONS or "mixed". swaps in a
+# Population update the distances from the edges they change (see Population.swapRows),
+# the other moves rescore the mutated members together in one vectorized pass. when
+# neighbours is given the nearest neighbour moves of mutate are used instead, inversions
+# if move is "inversion" and swaps otherwise
+def mutatePopulation(population, mod, move="swap", neighbours=None):
+	if neighbours is not None:
+		return mutate(population, mod, neighbours, move)
 
-	for i, member in enumerate(population):
-		x = 1.0/ evaluate(member, distances)
+	if mod == 0:
+		mod = random.randint(1, 5)
 
-		if x < lowest:
-			lowest = x
-			lowestI = i
+	rows = 5 + np.flatnonzero(np.random.random_sample(max(len(population) - 5, 0)) < 1.0/mod)
+	if len(rows) == 0:
+		return population
+
+	if isinstance(population, Population) and move == "swap":
+		n = population.tours.shape[1]
+		population.swapRows(rows, np.random.randint(0, n, len(rows)), np.random.randint(0, n, len(rows)))
+		return population
+
+	if isinstance(population, Population):
+		tours = population.tours[rows]
+	else:
+		tours = toPopulationArray([population[i] for i in rows])
+	mutateTours(tours, move)
+
+	if isinstance(population, Population):
+		lengths, positions, shortest = tourStats(tours, population.distances)
+		population.evaluations += len(rows)
+		population.replaceRows(rows, tours, lengths)
+		population.setSteps(rows, positions, shortest)
+	else:
+		for i, tour in zip(rows.tolist(), tours.tolist()):
+			population[i][:] = tour
 
-	return lowest, lowestI
+	return population
 
-def getDistances(locations):
-	distances = []
+# applies a move to every row of an (N x n) array of tours in place, between two random
+# positions of each row. every move is written as the column each city is taken from
+def mutateTours(tours, move):
+	m, n = tours.shape
+	rows = np.arange(m)[:, None]
+	columns = np.arange(n)[None, :]
+
+	a = np.random.randint(0, n, m)
+	b = np.random.randint(0, n, m)
+	i = np.minimum(a, b)[:, None]
+	j = np.maximum(a, b)[:, None]
+	inside = (columns >= i) & (columns <= j)
+
+	if move == "mixed":
+		moves = np.random.randint(0, len(MUTATIONS), m)[:, None]
+	else:
+		moves = np.full((m, 1), MUTATIONS.index(move))
+
+	# swap the cities at i and j
+	source = np.where(columns == i, j, np.where(columns == j, i, columns))
+
+	# reverse the cities from i to j
+	source = np.where(moves == 1, np.where(inside, i + j - columns, columns), source)
+
+	# shuffle the cities from i to j, sorting on random keys that stay between i and j
+	if (moves == 2).any():
+		keys = np.where(inside, i + np.random.random_sample((m, n)) * (j - i + 1), columns)
+		source = np.where(moves == 2, np.argsort(keys, axis=1), source)
+
+	tours[:] = tours[rows, source]
+	return tours
+
+
+# returns a function giving the distance between two cities, whatever form distances is in
+def pairDistance(distances):
+	if isinstance(distances, np.ndarray):
+		return distances.item
+	if isinstance(distances, (CityIndex, SymmetricDistances)):
+		return distances.distance
+
+	return lambda a, b: distances[a][b]
+
+# improves a member with 2-opt and Or-opt moves and returns it with the change in its
+# total distance. only the nearest neighbours of each city are tried as new partners, and
+# a city is only looked at again once one of its edges has changed (don't-look bits).
+# every move is costed from the handful of edges it changes. stops after maxMoves
+# moves or once time.time() passes deadline, if either is given
+def localSearch(member, distances, neighbours, maxMoves=0, deadline=0):
+	d = pairDistance(distances)
+	tour = list(member)
+	n = len(tour)
+	position = [0] * n
+	for i, city in enumerate(tour):
+		position[city] = i
+
+	active = list(reversed(tour))
+	looking = bytearray([1]) * n
+	change = 0.0
+	moves = 0
+
+	while active:
+		if (maxMoves != 0 and moves >= maxMoves) or (deadline != 0 and time.time() > deadline):
+			break
+
+		a = active.pop()
+		looking[a] = 0
+
+		touched = twoOptMove(tour, position, d, neighbours, a)
+		if touched is None:
+			touched = orOptMove(tour, position, d, neighbours, a)
+		if touched is None:
+			continue
+
+		gain, cities = touched
+		change -= gain
+		moves += 1
+
+		for city in cities:
+			if not looking[city]:
+				looking[city] = 1
+				active.append(city)
+
+	return tour, change
+
+# tries to replace two edges of the tour, one of them touching city a, with two shorter
+# ones. applies the first improving move found and returns its gain and the cities whose
+# edges changed, or None
+def twoOptMove(tour, position, d, neighbours, a):
+	n = len(tour)
+	i = position[a]
+
+	for step in (1, -1):
+		b = tour[(i + step) % n]
+		ab = d(a, b)
+
+		for c in neighbours[a]:
+			if c >= n:
+				continue
+			ac = d(a, c)
+			# neighbours are sorted so nothing further on can make a shorter edge
+			if ac >= ab:
+				break
 
-	for i in range(0, len(locations)):
-		distancesI = []
-		for j in range(0, len(locations)):
+			j = position[c]
+			e = tour[(j + step) % n]
+			if c == b or e == a:
+				continue
+
+			gain = ab + d(c, e) - ac - d(b, e)
+			if gain > 1e-10:
+				# going forwards the path b..c is reversed, going backwards a..e is
+				if step == 1:
+					reverseSegment(tour, position, (i + 1) % n, j)
+				else:
+					reverseSegment(tour, position, i, (j - 1) % n)
+				return gain, (a, b, c, e)
+
+	return None
+
+# tries moving the run of 1 to 3 cities starting at city a between a neighbour of a and
+# the city next to it, in either orientation. applies the first improving move found and
+# returns its gain and the cities whose edges changed, or None
+def orOptMove(tour, position, d, neighbours, a):
+	n = len(tour)
+	i = position[a]
+
+	for length in (1, 2, 3):
+		if length > n - 3:
+			break
+
+		segment = [tour[(i + k) % n] for k in range(0, length)]
+		first, last = segment[0], segment[-1]
+		before = tour[(i - 1) % n]
+		after = tour[(i + length) % n]
+		removed = d(before, first) + d(last, after) - d(before, after)
+
+		for c in neighbours[a]:
+			if c >= n or c in segment:
+				continue
+			if d(a, c) >= removed:
+				break
+
+			j = position[c]
+			for e in (tour[(j + 1) % n], tour[(j - 1) % n]):
+				if e in segment:
+					continue
+
+				ce = d(c, e)
+				# first goes next to c, the segment is flipped if needed to keep last next to e
+				gain = removed - (d(c, first) + d(last, e) - ce)
+				if gain > 1e-10:
+					moveSegment(tour, position, i, length, c, e, segment)
+					return gain, (before, after, first, last, c, e)
+
+	return None
+
+# reverses the cities from index i to index j of the tour, wrapping past the end if
+# j comes before i, keeping position up to date. the shorter of the segment and the
+# rest of the tour is the one reversed, which gives the same loop
+def reverseSegment(tour, position, i, j):
+	n = len(tour)
+	length = (j - i) % n + 1
+
+	if length * 2 > n:
+		i, j = (j + 1) % n, (i - 1) % n
+		length = n - length
+
+	for k in range(0, length // 2):
+		x, y = (i + k) % n, (j - k) % n
+		tour[x], tour[y] = tour[y], tour[x]
+		position[tour[x]] = x
+		position[tour[y]] = y
+
+# takes the segment starting at index i out of the tour and puts it back between the
+# adjacent cities c and e, with segment[0] next to c
+def moveSegment(tour, position, i, length, c, e, segment):
+	n = len(tour)
+
+	# rotate the tour so the segment is at the end, then take it off
+	start = (i + length) % n
+	rest = (tour[start:] + tour[:start])[:n - length]
+
+	j = rest.index(c)
+	if rest[(j + 1) % len(rest)] == e:
+		rest[j + 1:j + 1] = segment
+	else:
+		rest[j:j] = segment[::-1]
+
+	tour[:] = rest
+	for k, city in enumerate(tour):
+		position[city] = k
+
+# runs localSearch on the members of the population from index start onwards (the
+# offspring), sharing a budget of maxMoves improving moves and maxSeconds seconds
+# across the whole generation. a member is only replaced if the improved tour isn't
+# already in the population
+def localSearchStage(population, distances, neighbours, start, maxMoves=0, maxSeconds=0):
+	totals = population.score()
+	deadline = time.time() + maxSeconds if maxSeconds != 0 else 0
+	moves = 0
+
+	for i in range(start, len(population)):
+		if (deadline != 0 and time.time() > deadline) or (maxMoves != 0 and moves >= maxMoves):
+			break
+
+		member, change = localSearch(population[i], distances, neighbours, maxMoves - moves if maxMoves != 0 else 0, deadline)
+		if change < 0 and member not in population:
+			population.replace(i, member, float(totals[i] + change))
+			moves += 1
+
+	return population
+
+
+# returns the length of the shortest path and the index it appears in the population
+def getFittest(population, distances):
+	return asPopulation(population, distances).fittest()
+
+# returns the distance between every pair of locations as a numpy matrix of dtype.
+# metric is one of
+#	"euclidean"	- straight line distance
+#	"euc_2d"	- straight line distance rounded to the nearest integer, as in TSPLIB
+#	"ceil_2d"	- straight line distance rounded up, as in TSPLIB
+#	"att"		- TSPLIB's pseudo-euclidean distance
+# the rounded metrics default to int32. if symmetric is set only the upper triangle is
+# kept, as a SymmetricDistances. if candidates is given a CityIndex is returned instead,
+# which keeps only the candidates nearest neighbours of each city and works out any
+# other distance when it is asked for
+def getDistances(locations, candidates=0, dtype=None, metric="euclidean", symmetric=False):
+	if candidates > 0:
+		return CityIndex(locations, candidates)
+
+	if dtype is None:
+		dtype = np.float64 if metric == "euclidean" else np.int32
+
+	locations = np.asarray(locations, dtype=np.float64)
+	n = len(locations)
+
+	if symmetric:
+		return SymmetricDistances(n, condensedDistances(locations, dtype, metric))
+
+	# rows are filled a block at a time so the temporaries stay a few MB
+	distances = np.empty((n, n), dtype=dtype)
+	block = max(1, 2**20 // max(n, 1))
+	for start in range(0, n, block):
+		rows = locations[start:start + block]
+		distances[start:start + block] = metricDistances(rows[:, None, 0] - locations[None, :, 0],
+			rows[:, None, 1] - locations[None, :, 1], metric)
+
+	return distances
+
+# returns the upper triangle of the distance matrix, row by row, as a flat array
+def condensedDistances(locations, dtype, metric):
+	n = len(locations)
+	condensed = np.empty(n * (n - 1) // 2, dtype=dtype)
+
+	start = 0
+	for i in range(0, n - 1):
+		end = start + n - 1 - i
+		condensed[start:end] = metricDistances(locations[i, 0] - locations[i + 1:, 0],
+			locations[i, 1] - locations[i + 1:, 1], metric)
+		start = end
+
+	return condensed
+
+# returns the distances given the x and y differences between cities
+def metricDistances(dx, dy, metric):
+	if metric == "euclidean":
+		return np.hypot(dx, dy)
+	if metric == "euc_2d":
+		return np.floor(np.hypot(dx, dy) + 0.5)
+	if metric == "ceil_2d":
+		return np.ceil(np.hypot(dx, dy))
+	if metric == "att":
+		r = np.sqrt((dx * dx + dy * dy) / 10.0)
+		t = np.floor(r + 0.5)
+		return np.where(t < r, t + 1, t)
+
+	raise ValueError("unknown metric " + str(metric))
+
+# a symmetric distance matrix that only stores the upper triangle, halving its memory.
+# distances[a, b] and distances[a][b] work as they do for a full matrix
+class SymmetricDistances(object):
+
+	def __init__(self, n, condensed):
+		self.n = n
+		self.condensed = condensed
+
+	def __len__(self):
+		return self.n
+
+	def __getitem__(self, key):
+		if isinstance(key, tuple):
+			return self.distance(key[0], key[1])
+
+		return DistanceRow(self, key)
+
+	def distance(self, a, b):
+		# city numbers can come from a uint16 tour, whose arithmetic would overflow
+		a, b = int(a), int(b)
+		if a == b:
+			return 0
+		if a > b:
+			a, b = b, a
+
+		return self.condensed[a * self.n - a * (a + 1) // 2 + b - a - 1]
+
+	# returns the distances between each pair of cities in two arrays of any shape
+	def gather(self, a, b):
+		i = np.minimum(a, b).astype(np.intp)
+		j = np.maximum(a, b).astype(np.intp)
+
+		# position of (i, j) in the flattened upper triangle, the diagonal is 0
+		k = i * self.n - i * (i + 1) // 2 + j - i - 1
+		return np.where(i == j, 0, self.condensed[np.where(i == j, 0, k)])
+
+# distance files start with a 64 byte header: a magic string, the number of cities,
+# the numpy dtype, the metric, whether the full matrix or the upper triangle follows and
+# the locationsDigest of the cities the distances are between, zeros if it isn't known
+DISTANCE_HEADER = struct.Struct("<8sQ8s16s8s16s")
+DISTANCE_MAGIC = b"TSPDIST1"
+
+# returns a 16 byte hash of the coordinates of the cities, to tell whether a distance file
+# was saved for the same cities
+def locationsDigest(locations):
+	return hashlib.md5(np.ascontiguousarray(locations, dtype=np.float64).tobytes()).digest()
+
+# saves a matrix from getDistances to a binary file that loadDistances can map back in.
+# locations, if given, are the coordinates of the cities, recorded by their locationsDigest
+def saveDistances(distances, path, metric="euclidean", locations=None):
+	if isinstance(distances, SymmetricDistances):
+		n, layout, data = distances.n, b"upper", np.asarray(distances.condensed)
+	else:
+		data = np.asarray(toDistanceMatrix(distances))
+		n, layout = len(data), b"dense"
+
+	with open(path, "wb") as output:
+		output.write(DISTANCE_HEADER.pack(DISTANCE_MAGIC, n, data.dtype.str.encode("ascii"),
+			metric.encode("ascii"), layout, b"" if locations is None else locationsDigest(locations)))
+		np.ascontiguousarray(data).tofile(output)
+
+# returns the header of a distance file as (n, dtype, metric, layout, digest)
+def readDistanceHeader(path):
+	with open(path, "rb") as source:
+		magic, n, dtype, metric, layout, digest = DISTANCE_HEADER.unpack(source.read(DISTANCE_HEADER.size))
+
+	if magic != DISTANCE_MAGIC:
+		raise ValueError(path + " is not a distance file")
+
+	dtype, metric, layout = [field.rstrip(b"\0").decode("ascii") for field in (dtype, metric, layout)]
+	return n, np.dtype(dtype), metric, layout, digest
+
+# opens a file written by saveDistances with np.memmap, so nothing is rebuilt or copied
+# and every process that opens the same file shares the same pages
+def loadDistances(path, mode="r"):
+	n, dtype, metric, layout, digest = readDistanceHeader(path)
+
+	if layout == "upper":
+		return SymmetricDistances(n, np.memmap(path, dtype=dtype, mode=mode, offset=DISTANCE_HEADER.size, shape=(n * (n - 1) // 2,)))
+
+	return np.memmap(path, dtype=dtype, mode=mode, offset=DISTANCE_HEADER.size, shape=(n, n))
+
+# returns the distances between locations from the file at path if it was saved for
+# the same cities (by their locationsDigest) and metric, otherwise builds and saves them
+def cachedDistances(locations, path, dtype=None, metric="euclidean", symmetric=False):
+	if os.path.exists(path):
+		n, savedDtype, savedMetric, layout, digest = readDistanceHeader(path)
+		if (n == len(locations) and savedMetric == metric and (layout == "upper") == symmetric
+				and (dtype is None or np.dtype(dtype) == savedDtype) and digest == locationsDigest(locations)):
+			return loadDistances(path)
+
+	saveDistances(getDistances(locations, dtype=dtype, metric=metric, symmetric=symmetric), path, metric, locations)
+	return loadDistances(path)
+
+# returns distances ready to use, opening them with loadDistances if given a file path
+def openDistances(distances):
+	if isinstance(distances, str):
+		return loadDistances(distances)
 
-			dist = math.hypot(locations[i][0] - locations[j][0], locations[i][1] - locations[j][1])
-			distancesI.append(dist)
-		distances.append(distancesI)
 	return distances
 
+# the TSPLIB edge weight types whose distances getDistances can work out from coordinates
+TSPLIB_METRICS = {"EUC_2D": "euc_2d", "CEIL_2D": "ceil_2d", "ATT": "att"}
+
+# the positions each TSPLIB EXPLICIT edge weight format lists its weights in, row by row
+TSPLIB_WEIGHTS = {
+	"UPPER_ROW": (np.triu_indices, 1),
+	"LOWER_COL": (np.triu_indices, 1),
+	"LOWER_ROW": (np.tril_indices, -1),
+	"UPPER_COL": (np.tril_indices, -1),
+	"UPPER_DIAG_ROW": (np.triu_indices, 0),
+	"LOWER_DIAG_COL": (np.triu_indices, 0),
+	"LOWER_DIAG_ROW": (np.tril_indices, 0),
+	"UPPER_DIAG_COL": (np.tril_indices, 0)}
+
+# reads a TSPLIB problem file and returns its distances, the locations of its cities
+# (None if it only gives weights) and its specification as a dict, e.g. header["NAME"].
+# coordinates are turned into distances by getDistances, with candidates and symmetric
+# passed on, and EXPLICIT weights in FULL_MATRIX or any of the triangular formats are
+# read into a full matrix, or a SymmetricDistances if symmetric is set
+def readTSPLIB(path, candidates=0, symmetric=False):
+	header, sections = readTSPLIBSections(path)
+	n = int(header["DIMENSION"])
+	weightType = header.get("EDGE_WEIGHT_TYPE", "EXPLICIT")
+
+	if weightType != "EXPLICIT":
+		if weightType not in TSPLIB_METRICS:
+			raise ValueError("unsupported EDGE_WEIGHT_TYPE " + weightType)
+
+		locations = np.array(sections["NODE_COORD_SECTION"], dtype=np.float64).reshape(n, -1)[:, 1:3]
+		return getDistances(locations, candidates, metric=TSPLIB_METRICS[weightType], symmetric=symmetric), locations, header
+
+	weights = np.array(sections["EDGE_WEIGHT_SECTION"], dtype=np.float64)
+	if np.all(weights == np.floor(weights)):
+		weights = weights.astype(np.int32)
+
+	weightFormat = header.get("EDGE_WEIGHT_FORMAT", "FULL_MATRIX")
+	if weightFormat == "FULL_MATRIX":
+		distances = weights[:n * n].reshape(n, n)
+	elif weightFormat in TSPLIB_WEIGHTS:
+		triangle, diagonal = TSPLIB_WEIGHTS[weightFormat]
+		rows, columns = triangle(n, diagonal)
+		distances = np.zeros((n, n), dtype=weights.dtype)
+		distances[rows, columns] = weights[:len(rows)]
+		distances[columns, rows] = weights[:len(rows)]
+	else:
+		raise ValueError("unsupported EDGE_WEIGHT_FORMAT " + weightFormat)
+
+	if symmetric:
+		distances = SymmetricDistances(n, distances[np.triu_indices(n, 1)])
+
+	locations = None
+	if "DISPLAY_DATA_SECTION" in sections:
+		locations = np.array(sections["DISPLAY_DATA_SECTION"], dtype=np.float64).reshape(n, -1)[:, 1:3]
+
+	return distances, locations, header
+
+# reads a TSPLIB tour file, such as the .opt.tour files of the known optimal tours, and
+# returns the tour as a list of cities numbered from 0
+def readTSPLIBTour(path):
+	header, sections = readTSPLIBSections(path)
+	tour = []
+	for city in sections["TOUR_SECTION"]:
+		if city == "-1":
+			break
+		tour.append(int(city) - 1)
+
+	return tour
+
+# splits a TSPLIB file into its specification, e.g. {"NAME": "att48", ...}, and the
+# whitespace separated values of each of its sections
+def readTSPLIBSections(path):
+	header = {}
+	sections = {}
+	values = None
+
+	with open(path) as source:
+		for line in source:
+			line = line.strip()
+			keyword = line.split(":")[0].strip()
+
+			if not line or line == "EOF":
+				continue
+			elif keyword.endswith("_SECTION"):
+				values = sections.setdefault(keyword, [])
+			elif ":" in line and keyword.replace("_", "").isalpha():
+				header[keyword] = line.split(":", 1)[1].strip()
+				values = None
+			elif values is not None:
+				values.extend(line.split())
+
+	return header, sections
+
+# the matrices updateDistances has made, by id, which it may change in place
+GROWABLE = weakref.WeakValueDictionary()
+
+# updates a distance matrix after the cities numbered in removed are taken away and cities
+# at the coordinates in added are put in, working out only the rows and columns that change.
+# so cities stay numbered 0 to n-1 the last kept cities take the numbers of removed ones and
+# added cities are numbered after every kept one. returns the new matrix, the coordinates of
+# the cities in their new order and an array of each old city's new number, -1 if removed.
+# the first time the matrix is copied into one with spare more rows and the new matrix is a
+# view of that, so later updates change it in place without a copy until it is full. a
+# matrix updateDistances didn't make itself is never changed
+def updateDistances(distances, locations, removed=(), added=(), metric="euclidean", spare=64):
+	distances = toDistanceMatrix(distances)
+	if not isinstance(distances, np.ndarray):
+		raise TypeError("only full distance matrices can be updated, use getDistances for the others")
+
+	locations = np.asarray(locations, dtype=np.float64)
+	added = np.asarray(added, dtype=np.float64).reshape(-1, 2)
+	n = len(distances)
+
+	gone = np.zeros(n, dtype=bool)
+	gone[np.asarray(removed, dtype=np.intp)] = True
+	kept = n - int(gone.sum())
+	size = kept + len(added)
+
+	# kept cities numbered kept or above move into the places of the removed ones below kept
+	holes = np.flatnonzero(gone[:kept])
+	movers = kept + np.flatnonzero(~gone[kept:])
+	relabel = np.arange(n)
+	relabel[gone] = -1
+	relabel[movers] = holes
+
+	matrix = growableMatrix(distances, size)
+	if matrix is None:
+		matrix = np.empty((size + spare, size + spare), dtype=distances.dtype)
+		matrix[:n, :n] = distances
+		GROWABLE[id(matrix)] = matrix
+
+	matrix[holes, :n] = matrix[movers, :n]
+	matrix[:n, holes] = matrix[:n, movers]
+
+	cities = np.empty((size, 2))
+	cities[:kept] = locations[:kept]
+	cities[holes] = locations[movers]
+	cities[kept:] = added
+
+	if len(added):
+		rows = metricDistances(added[:, None, 0] - cities[None, :, 0], added[:, None, 1] - cities[None, :, 1], metric)
+		matrix[kept:size, :size] = rows
+		matrix[:size, kept:size] = rows.T
+
+	return matrix[:size, :size], cities, relabel
+
+# returns the matrix made by updateDistances that distances is the top left corner of (or
+# distances itself) if it has room for size cities, otherwise None
+def growableMatrix(distances, size):
+	for matrix in (distances.base, distances):
+		if (isinstance(matrix, np.ndarray) and GROWABLE.get(id(matrix)) is matrix
+				and matrix.ndim == 2 and matrix.shape[0] == matrix.shape[1] >= size
+				and matrix.flags.writeable and matrix.strides == distances.strides
+				and matrix.ctypes.data == distances.ctypes.data):
+			return matrix
+
+	return None
+
+# patches tours to match a matrix from updateDistances: removed cities are cut out, joining
+# the cities either side of them, the rest are renumbered with relabel, and each added city
+# (those numbered first or above) is put where it adds the least distance to each tour
+def patchTours(tours, relabel, distances, first):
+	tours = relabel[toPopulationArray(tours)]
+	tours = tours[tours >= 0].reshape(len(tours), -1)
+	rows = np.arange(len(tours))
+
+	for city in range(first, len(distances)):
+		following = np.roll(tours, -1, axis=1)
+		cost = (gatherDistances(distances, tours, city) + gatherDistances(distances, city, following)
+			- gatherDistances(distances, tours, following))
+
+		# every column from the cheapest gap on shifts one to the right
+		position = np.argmin(cost, axis=1) + 1
+		columns = np.arange(tours.shape[1] + 1)
+		patched = tours[rows[:, None], np.minimum(columns - (columns > position[:, None]), tours.shape[1] - 1)]
+		patched[rows, position] = city
+		tours = patched
+
+	return tours
+
+# distances between cities given by their coordinates, worked out when they are
+# needed rather than stored. the k nearest neighbours of each city are found with
+# a grid and kept along with their distances, so memory grows with n*k not n*n
+class CityIndex(object):
+
+	def __init__(self, locations, k=10):
+		self.locations = np.asarray(locations, dtype=np.float64)
+		self.neighbours, self.neighbourDistances = nearestNeighbours(self.locations, k)
+
+	def __len__(self):
+		return len(self.locations)
+
+	# distances[a, b] is the distance between two cities, and distances[a][b]
+	# works the same way as it does for a list of lists
+	def __getitem__(self, key):
+		if isinstance(key, tuple):
+			return self.distance(key[0], key[1])
+
+		return DistanceRow(self, key)
+
+	def distance(self, a, b):
+		return math.hypot(self.locations[a, 0] - self.locations[b, 0], self.locations[a, 1] - self.locations[b, 1])
+
+	# returns the distances between each pair of cities in two arrays of any shape
+	def gather(self, a, b):
+		return np.hypot(self.locations[a, 0] - self.locations[b, 0], self.locations[a, 1] - self.locations[b, 1])
+
+# a single row of a CityIndex or SymmetricDistances, as in distances[a]
+class DistanceRow(object):
+
+	def __init__(self, index, city):
+		self.index = index
+		self.city = city
+
+	def __len__(self):
+		return len(self.index)
+
+	def __getitem__(self, other):
+		if other >= len(self.index):
+			raise IndexError("city out of range")
+
+		return self.index.distance(self.city, other)
+
+# returns the k nearest neighbours of every location, closest first, and their
+# distances. locations are bucketed into a grid of about two per cell, and each
+# cell searches outwards ring by ring until its k nearest are certain to be found
+def nearestNeighbours(locations, k):
+	n = len(locations)
+	k = min(k, n - 1)
+	if k < 1:
+		return np.zeros((n, 0), dtype=np.intp), np.zeros((n, 0))
+
+	lowest = locations.min(axis=0)
+	cellsPerSide = max(1, int(math.sqrt(n / 2.0)))
+	cellSize = max(float((locations.max(axis=0) - lowest).max()), 1e-9) / cellsPerSide
+
+	cells = np.minimum(((locations - lowest) / cellSize).astype(np.intp), cellsPerSide - 1)
+	cellIds = cells[:, 0] * cellsPerSide + cells[:, 1]
+	order = np.argsort(cellIds, kind="mergesort")
+	starts = np.searchsorted(cellIds[order], np.arange(cellsPerSide * cellsPerSide), side="left")
+	ends = np.searchsorted(cellIds[order], np.arange(cellsPerSide * cellsPerSide), side="right")
+
+	neighbours = np.empty((n, k), dtype=np.intp)
+	neighbourDistances = np.empty((n, k))
+
+	for cell in np.unique(cellIds):
+		cx, cy = divmod(int(cell), cellsPerSide)
+		cities = order[starts[cell]:ends[cell]]
+		ring = 1
+
+		while True:
+			# the cells within ring of this one are a run of ids in each grid column
+			yLow, yHigh = max(cy - ring, 0), min(cy + ring, cellsPerSide - 1)
+			candidates = []
+			for x in range(max(cx - ring, 0), min(cx + ring, cellsPerSide - 1) + 1):
+				candidates.append(order[starts[x * cellsPerSide + yLow]:ends[x * cellsPerSide + yHigh]])
+			candidates = np.concatenate(candidates)
+
+			everything = ring >= cellsPerSide
+			if len(candidates) > k or everything:
+				d = np.hypot(locations[cities, 0][:, None] - locations[candidates, 0][None, :],
+					locations[cities, 1][:, None] - locations[candidates, 1][None, :])
+				d[cities[:, None] == candidates[None, :]] = np.inf
+
+				rows = np.arange(len(cities))[:, None]
+				nearest = np.argpartition(d, k - 1, axis=1)[:, :k]
+				nearestDistances = d[rows, nearest]
+
+				# anything outside the searched cells is at least ring cells away
+				if everything or nearestDistances.max() <= ring * cellSize:
+					byDistance = np.argsort(nearestDistances, axis=1)
+					neighbours[cities] = candidates[nearest[rows, byDistance]]
+					neighbourDistances[cities] = nearestDistances[rows, byDistance]
+					break
+
+			ring += 1
+
+	return neighbours, neighbourDistances
+
+# returns the k nearest neighbours of each city, closest first, as lists for the
+# crossover and mutation operators. a CityIndex already has them, for a full
+# distance matrix they are found by partitioning each row
+def getNeighbours(distances, k=10):
+	if isinstance(distances, CityIndex):
+		return distances.neighbours[:, :k].tolist()
+
+	matrix = toDistanceMatrix(distances)
+	n = len(matrix)
+	k = min(k, n - 1)
+	nearest = np.empty((n, k), dtype=np.intp)
+
+	# a block of rows at a time, so a large or memory mapped matrix is never copied whole
+	block = max(1, 2**20 // max(n, 1))
+	for start in range(0, n, block):
+		cities = np.arange(start, min(start + block, n))
+		rows = np.arange(len(cities))[:, None]
+		d = gatherDistances(matrix, cities[:, None], np.arange(n)[None, :]).astype(np.float64)
+		d[rows[:, 0], cities] = np.inf
+
+		part = np.argpartition(d, k - 1, axis=1)[:, :k]
+		nearest[cities] = part[rows, np.argsort(d[rows, part], axis=1)]
+
+	return nearest.tolist()
+
 def plotCities(locations):
+	# only imported when a plot is wanted so importing this module stays quick
+	import matplotlib.pyplot as plt
+
 	plt.xticks(np.arange(0, 201, 20))
 	plt.yticks(np.arange(0, 201, 20))
 	plt.grid(True)
@@ -284,9 +2016,84 @@ def sortByPath(path, locations):
 	return sortedLocations
 
 
-def testHarness2(numTests):
-
-	selection = input("Which Problem Domain would you like to use?\n1.\tFirst Domain (Graphical Representation)\n2.\tSecond Domain (No Grphical Representation, Britain Example)\n3.\tRun tests on second Problem Domain\n")
+# runs one trial of a batch, seeded so every trial is independent of the
+# others and of which worker process it lands in
+def runTrial(args):
+	algorithm, trial, seed, numEntries, sizeEntries, distances, numGenerations, terminationCondition, mod = args
+	random.seed(seed)
+	np.random.seed(seed % 2**32)
+
+	start = time.time()
+	bestPath, distance, gensTaken = algorithm(numEntries, sizeEntries, distances, numGenerations, terminationCondition, mod)
+
+	return {"trial": trial, "seed": seed, "gensTaken": gensTaken, "distance": distance, "seconds": time.time() - start}
+
+# returns the path of the csv file runBatch writes the trials of algorithm to in
+# directory, or None if directory is None
+def resultsPath(directory, algorithm):
+	if directory is None:
+		return None
+
+	return os.path.join(directory, algorithm + "_results.csv")
+
+# runs numTests trials of one of the TSG_* algorithms over a pool of processes and
+# returns the mean, median and 95th percentile of the generations taken and the wall
+# time per trial. if outputPath is given the trials are written to it as csv, or as
+# json along with the summary when it ends in .json
+def runBatch(algorithm, numTests, numEntries, sizeEntries, distances, numGenerations, terminationCondition, mod, processes=0, seed=None, outputPath=None):
+	if seed is None:
+		seed = random.randint(0, 2**31 - 1)
+
+	trials = []
+	for i in range(0, numTests):
+		trials.append((algorithm, i, seed + i, numEntries, sizeEntries, distances, numGenerations, terminationCondition, mod))
+
+	pool = multiprocessing.Pool(processes or None)
+	try:
+		trials = sorted(pool.imap_unordered(runTrial, trials), key=lambda trial: trial["trial"])
+	finally:
+		pool.close()
+		pool.join()
+
+	gensTaken = np.array([trial["gensTaken"] for trial in trials])
+	seconds = np.array([trial["seconds"] for trial in trials])
+
+	results = {
+		"algorithm": algorithm.__name__,
+		"numTests": numTests,
+		"seed": seed,
+		"terminationCondition": terminationCondition,
+		"mod": mod,
+		"meanGenerations": float(gensTaken.mean()),
+		"medianGenerations": float(np.median(gensTaken)),
+		"p95Generations": float(np.percentile(gensTaken, 95)),
+		"meanSeconds": float(seconds.mean()),
+		"medianSeconds": float(np.median(seconds)),
+		"p95Seconds": float(np.percentile(seconds, 95))}
+
+	if outputPath is not None:
+		writeBatch(outputPath, results, trials)
+
+	return results
+
+# writes the trials of a batch to a csv file, or the trials and summary to a json file
+def writeBatch(outputPath, results, trials):
+	if outputPath.endswith(".json"):
+		with open(outputPath, "w") as output:
+			json.dump({"summary": results, "trials": trials}, output, indent=1)
+		return
+
+	with open(outputPath, "w") as output:
+		writer = csv.writer(output)
+		writer.writerow(["algorithm", "trial", "seed", "gensTaken", "distance", "seconds"])
+		for trial in trials:
+			writer.writerow([results["algorithm"], trial["trial"], trial["seed"], trial["gensTaken"], trial["distance"], trial["seconds"]])
+
+# the per-trial results of test mode 3 are written to TSG_*_results.csv files in
+# resultsDirectory if it's given, otherwise only the summary is printed
+def testHarness2(numTests, resultsDirectory=None):
+
+	selection = int(input("Which Problem Domain would you like to use?\n1.\tFirst Domain (Graphical Representation)\n2.\tSecond Domain (No Grphical Representation, Britain Example)\n3.\tRun tests on second Problem Domain\n"))
 	if selection == 1:
 		cityLocations = 	[	[20, 20],
 								[20, 40],
@@ -321,10 +2128,10 @@ def testHarness2(numTests):
 
 		cityLocations = sortByPath(bestPath, cityLocations)
 
-		print "Shortest path:", bestPath[0],
+		print("Shortest path:", bestPath[0], end=" ")
 		for i, city in enumerate(bestPath[1:]):
-			print  "->", bestPath[i],
-		print "\nTotal Distance: ", distance
+			print("->", bestPath[i], end=" ")
+		print("\nTotal Distance: ", distance)
 
 
 		plotCities(cityLocations)
@@ -354,84 +2161,72 @@ def testHarness2(numTests):
 
 		bestPath, distance, gensTaken = TSG_Truncation_Twin(numEntries, sizeEntries, distances, numGenerations, 0, 0)
 
-		print "Shortest path:", cityList[bestPath[0]],
+		print("Shortest path:", cityList[bestPath[0]], end=" ")
 		for i, city in enumerate(bestPath[1:]):
-			print  "->", cityList[city],
-		print "\nTotal Distance: ", distance
+			print("->", cityList[city], end=" ")
+		print("\nTotal Distance: ", distance)
 
 
 
 	if selection == 3:
-		selection = input("Which version of the algorithm would you like to use?\n1.\tTruncation Selection & Only Child Crossover\n2.\tTruncation Selection & Twin Crossover\n3.\tRoulette Selection and Only Child Crossover\n4.\tRoulette Selection and Twin Crossover\n")
-		mod = input("What would you like to use for the upper bound for mutation? (higher -> less likely for members to mutate)")
+		selection = int(input("Which version of the algorithm would you like to use?\n1.\tTruncation Selection & Only Child Crossover\n2.\tTruncation Selection & Twin Crossover\n3.\tRoulette Selection and Only Child Crossover\n4.\tRoulette Selection and Twin Crossover\n"))
+		mod = int(input("What would you like to use for the upper bound for mutation? (higher -> less likely for members to mutate)"))
 
 
 
 		if selection == 1:
 
 			bestPath, distance, gensTaken = TSG_Truncation_OC(numEntries, sizeEntries, distances, numGenerations, 0, mod)
-			print distance
+			print(distance)
 			terminationCondition = distance
-			avg = 0
 
-			for i in range (0, numTests):
-				bestPath, distance, gensTaken = TSG_Truncation_OC(numEntries, sizeEntries, distances, numGenerations, terminationCondition, mod)
-				#print "Terminated after ", gensTaken, "with distance ", distance
-				avg += gensTaken
+			# the trials are independent so they are spread over every core
+			results = runBatch(TSG_Truncation_OC, numTests, numEntries, sizeEntries, distances, numGenerations, terminationCondition, mod, outputPath=resultsPath(resultsDirectory, "TSG_Truncation_OC"))
+			avg = results["meanGenerations"]
+			print("Median", results["medianGenerations"], "95th percentile", results["p95Generations"], "generations,", results["meanSeconds"], "seconds per trial")
 
-			avg/=numTests
-
-			print "Using Truncation Selection & Only Child Crossover, Average # Generations to achieve target fitness is", avg
+			print("Using Truncation Selection & Only Child Crossover, Average # Generations to achieve target fitness is", avg)
 
 
 		if selection == 2:
 
 			bestPath, distance, gensTaken = TSG_Truncation_Twin(numEntries, sizeEntries, distances, numGenerations, 0, 0)
-			print distance
+			print(distance)
 			terminationCondition = distance
-			avg = 0
-
-			for i in range (0, numTests):
-				bestPath, distance, gensTaken = TSG_Truncation_Twin(numEntries, sizeEntries, distances, numGenerations, terminationCondition, mod)
-				#print "Terminated after ", gensTaken, "with distance ", distance
-				avg += gensTaken
 
-			avg/=numTests
+			# the trials are independent so they are spread over every core
+			results = runBatch(TSG_Truncation_Twin, numTests, numEntries, sizeEntries, distances, numGenerations, terminationCondition, mod, outputPath=resultsPath(resultsDirectory, "TSG_Truncation_Twin"))
+			avg = results["meanGenerations"]
+			print("Median", results["medianGenerations"], "95th percentile", results["p95Generations"], "generations,", results["meanSeconds"], "seconds per trial")
 
-			print "Using Truncation Selection & Twin Crossover, Average # Generations to achieve target fitness is", avg
+			print("Using Truncation Selection & Twin Crossover, Average # Generations to achieve target fitness is", avg)
 
 
 		if selection == 3:
 
 			bestPath, distance, gensTaken = TSG_Roulette_OC(numEntries, sizeEntries, distances, numGenerations, 0, 0)
-			print distance
+			print(distance)
 			terminationCondition = distance
-			avg = 0
 
-			for i in range (0, numTests):
-				bestPath, distance, gensTaken = TSG_Roulette_OC(numEntries, sizeEntries, distances, numGenerations, terminationCondition, mod)
-				#print "Terminated after ", gensTaken, "with distance ", distance
-				avg += gensTaken
+			# the trials are independent so they are spread over every core
+			results = runBatch(TSG_Roulette_OC, numTests, numEntries, sizeEntries, distances, numGenerations, terminationCondition, mod, outputPath=resultsPath(resultsDirectory, "TSG_Roulette_OC"))
+			avg = results["meanGenerations"]
+			print("Median", results["medianGenerations"], "95th percentile", results["p95Generations"], "generations,", results["meanSeconds"], "seconds per trial")
 
-			avg/=numTests
-
-			print "Using Roulette Selection & Only Child Crossover, Average # Generations to achieve target fitness is", avg
+			print("Using Roulette Selection & Only Child Crossover, Average # Generations to achieve target fitness is", avg)
 
 		if selection == 4:	
 	
 			bestPath, distance, gensTaken = TSG_Roulette_Twin(numEntries, sizeEntries, distances, numGenerations, 0, 0)
-			print distance
+			print(distance)
 			terminationCondition = distance
-			avg = 0
-
-			for i in range (0, numTests):
-				bestPath, distance, gensTaken = TSG_Roulette_Twin(numEntries, sizeEntries, distances, numGenerations, terminationCondition, mod)
-				#print "Terminated after ", gensTaken, "with distance ", distance
-				avg += gensTaken
 
-			avg/=numTests
+			# the trials are independent so they are spread over every core
+			results = runBatch(TSG_Roulette_Twin, numTests, numEntries, sizeEntries, distances, numGenerations, terminationCondition, mod, outputPath=resultsPath(resultsDirectory, "TSG_Roulette_Twin"))
+			avg = results["meanGenerations"]
+			print("Median", results["medianGenerations"], "95th percentile", results["p95Generations"], "generations,", results["meanSeconds"], "seconds per trial")
 
-			print "Using Roulette Selection & Tein Crossover, Average # Generations to achieve target fitness is", avg
+			print("Using Roulette Selection & Tein Crossover, Average # Generations to achieve target fitness is", avg)
 
 
 
@@ -440,87 +2235,855 @@ def testHarness2(numTests):
 ############################################################################################
 
 
-# main algorithms uses everything else to initialize the population, alter it genertically 
-# over a defined number of iterations and then returns the shortest path it can find
-def TSG_Truncation_OC(numEntries, sizeEntries, distances, numGenerations, terminationCondition, mod):
-	population = initialize(numEntries, sizeEntries)
-
-
-	# loop numGenerations times, select, crossover and mutate the population every iteration
-	for i in range (0, numGenerations):
-		gensTaken = i
-		population =	mutate(
-						ocCrossover(
-						truncationSelect(population, distances, numEntries), distances, sizeEntries), mod)
-
-		if (terminationCondition != 0):
-			lowest, lowestIndex = getFittest(population, distances)
-			if (lowest <= terminationCondition):
-				break;
-
-	# finally, take the shortest path in the remaining population 
-	lowest, lowestIndex = getFittest(population, distances)
-	return population[lowestIndex], 1.0/evaluate(population[lowestIndex], distances), gensTaken
-
-def TSG_Roulette_OC(numEntries, sizeEntries, distances, numGenerations, terminationCondition, mod):
-	population = initialize(numEntries, sizeEntries)
-
-	# loop numGenerations times, select, crossover and mutate the population every iteration
-	for i in range (0, numGenerations):
-		gensTaken = i
-		population =	mutate(
-						ocCrossover(
-						rouletteSelect(population, distances, numEntries), distances, sizeEntries), mod)
-
-		if (terminationCondition != 0):
-			lowest, lowestIndex = getFittest(population, distances)
-			if (lowest <= terminationCondition):
-				break;
-
-	# finally, take the shortest path in the remaining population 
-	lowest, lowestIndex = getFittest(population, distances)
-	return population[lowestIndex], 1.0/evaluate(population[lowestIndex], distances), gensTaken
+# returns the processor time this process has used in seconds, which unlike the time
+# on the clock doesn't count time spent waiting on other processes
+def processTime():
+	if hasattr(time, "process_time"):
+		return time.process_time()
+
+	return time.clock()
+
+# a multi-armed bandit that picks one of a number of arms by discounted UCB. every update
+# counts the rewards so far for decay times less, so it follows the best arm as it changes
+# over a run, and arms tried less recently get a bonus of exploration times the usual UCB
+# term. the mean rewards are scaled by the largest of them, so the bonus means the same
+# whatever the rewards are measured in. arms not yet tried are tried first, in order
+class Bandit(object):
+
+	def __init__(self, arms, decay=0.9, exploration=0.5):
+		self.decay = decay
+		self.exploration = exploration
+		self.counts = np.zeros(arms)
+		self.totals = np.zeros(arms)
+
+	def choose(self):
+		untried = np.flatnonzero(self.counts == 0)
+		if len(untried):
+			return int(untried[0])
+
+		means = self.totals / self.counts
+		means /= np.abs(means).max() or 1.0
+		bonus = self.exploration * np.sqrt(np.log(1 + self.counts.sum()) / self.counts)
+
+		return int(np.argmax(means + bonus))
+
+	def update(self, arm, reward):
+		self.counts *= self.decay
+		self.totals *= self.decay
+		self.counts[arm] += 1
+		self.totals[arm] += reward
+
+# the settings AdaptiveControl picks between by default, numEntries as multiples of the
+# solver's own. offspring is how many times its size the crossover tops the population up to
+ADAPTIVE_SETTINGS = {
+	"crossover": ("twin", "oc", "ox", "pmx", "erx"),
+	"mutation": MUTATIONS,
+	"mod": (1, 2, 3, 5, 10),
+	"offspring": (2, 3, 4),
+	"numEntries": (0.5, 1, 2)}
+
+# tunes a GeneticTSPSolver's operators and parameters while it runs, with a Bandit for
+# each of settings (ADAPTIVE_SETTINGS by default). before each generation every bandit
+# picks a value and it's set on the solver, afterwards each is rewarded with how much the
+# generation shortened the mean of the solver's starting numEntries shortest members, as
+# a fraction, per second of processor time. so effort shifts to whichever crossover,
+# mutation, mod and offspring are paying off at that point of the run. the population is
+# only resized every resizeEvery generations, and rewarded over all of them, since a size
+# takes a few generations to show what it's worth. strategies the solver was given as
+# functions are left alone, and restore puts back the solver's own settings
+class AdaptiveControl(object):
+
+	def __init__(self, solver, settings=None, decay=0.9, exploration=0.5, resizeEvery=10):
+		settings = dict(ADAPTIVE_SETTINGS if settings is None else settings)
+		unknown = set(settings) - set(ADAPTIVE_SETTINGS)
+		if unknown:
+			raise ValueError("unknown adaptive settings " + ", ".join(sorted(unknown)))
+
+		for name in ("crossover", "mutation"):
+			if callable(getattr(solver, name)):
+				settings.pop(name, None)
+
+		self.solver = solver
+		self.settings = settings
+		self.names = sorted(settings)
+		self.bandits = dict((name, Bandit(len(settings[name]), decay, exploration)) for name in self.names)
+		self.baseline = dict((name, getattr(solver, name)) for name in self.names)
+		self.survivors = solver.numEntries
+		self.resizeEvery = resizeEvery
+		self.arms = {}
+		self.held = 0
+		self.window = [0.0, 0.0]
+		self.before = 0.0
+		self.started = 0.0
+
+	# picks the settings for the next generation of population and sets them on the solver
+	def begin(self, population):
+		for name in self.names:
+			if name == "numEntries" and self.held % self.resizeEvery != 0:
+				continue
+
+			self.arms[name] = self.bandits[name].choose()
+			value = self.settings[name][self.arms[name]]
+			if name == "numEntries":
+				# never more survivors than there are members to select them from
+				value = max(2, min(int(round(self.baseline[name] * value)), len(population)))
+			setattr(self.solver, name, value)
+
+		self.before = self.quality(population)
+		self.started = processTime()
+
+	# rewards the settings picked by begin with how the generation that made population
+	# went, and returns that reward
+	def end(self, population):
+		seconds = max(processTime() - self.started, 1e-6)
+		improvement = (self.before - self.quality(population)) / (self.before or 1.0)
+
+		for name, arm in self.arms.items():
+			if name != "numEntries":
+				self.bandits[name].update(arm, improvement / seconds)
+
+		if "numEntries" in self.arms:
+			self.window[0] += improvement
+			self.window[1] += seconds
+			self.held += 1
+			if self.held % self.resizeEvery == 0:
+				self.bandits["numEntries"].update(self.arms["numEntries"], self.window[0] / self.window[1])
+				self.window = [0.0, 0.0]
+
+		return improvement / seconds
+
+	# returns the mean distance of the shortest members, as many as the solver started with
+	def quality(self, population):
+		lengths = population.score()
+		count = min(self.survivors, len(lengths))
+
+		return float(np.partition(lengths, count - 1)[:count].mean())
+
+	# returns the settings the solver is using
+	def current(self):
+		return dict((name, getattr(self.solver, name)) for name in self.names)
+
+	def restore(self):
+		for name, value in self.baseline.items():
+			setattr(self.solver, name, value)
+
+# a genetic algorithm for the travelling salesman problem with pluggable strategies.
+# selection is "truncation", "roulette" or a function called as
+# select(population, distances, size, out). crossover is a name in CROSSOVERS or a
+# function called as crossover(population, distances, sizeEntries). mutation is a name
+# in MUTATIONS, "mixed", or a function called as mutate(population, mod). termination is
+# an optional function called as termination(population, generation) after every
+# generation, the run stops when it returns True, as well as when terminationCondition,
+# patience, minDiversity or timeLimit are met (see ConvergenceMonitor). seeding and
+# locations are passed to initialize to build some starting members with heuristics.
+# telemetry, if given, is a function called with a record of every generation (see
+# timedStep) or the path of a file the records are appended to, one JSON object a line.
+# without it nothing is timed or measured. checkpoint, if given, is the path of a file
+# the state of the run is saved to every checkpointSeconds seconds and when it ends, and
+# that solve(resume=True) carries on from. best() returns the best tour so far while a run
+# is going, e.g. from another thread, and stop() ends it early with that tour. offspring,
+# if given, is how many times its size each crossover tops the population up to rather
+# than its own default. adaptive, if set, tunes the operators and parameters as the run
+# goes (see AdaptiveControl), with its settings if it's a dict like ADAPTIVE_SETTINGS.
+# the controller in use is kept in self.control and starts afresh when a run resumes.
+# as its rewards depend on timings, an adaptive run can't be repeated exactly from a seed.
+# sizeEntries of 0 uses every city. the distance matrix and neighbour lists are worked
+# out once and kept, so a solver can be made once and solve called on it again and again
+class GeneticTSPSolver(object):
+
+	def __init__(self, distances=None, numEntries=50, sizeEntries=0, selection="truncation",
+			crossover="twin", mutation="swap", mod=0, numGenerations=1000, terminationCondition=0,
+			canonical=False, sampling="keys", neighbours=None, searchMoves=0, searchSeconds=0,
+			patience=0, minDiversity=0, timeLimit=0, termination=None, seeding=None, locations=None, telemetry=None,
+			checkpoint=None, checkpointSeconds=60, offspring=0, adaptive=False):
+		self.numEntries = numEntries
+		self.cities = sizeEntries
+		self.selection = selection
+		self.crossover = crossover
+		self.mutation = mutation
+		self.mod = mod
+		self.numGenerations = numGenerations
+		self.terminationCondition = terminationCondition
+		self.canonical = canonical
+		self.sampling = sampling
+		self.neighbours = neighbours
+		self.searchMoves = searchMoves
+		self.searchSeconds = searchSeconds
+		self.patience = patience
+		self.minDiversity = minDiversity
+		self.timeLimit = timeLimit
+		self.termination = termination
+		self.seeding = seeding
+		self.telemetry = telemetry
+		self.checkpoint = checkpoint
+		self.checkpointSeconds = checkpointSeconds
+		self.offspring = offspring
+		self.adaptive = adaptive
+
+		if isinstance(selection, str) and selection not in ("truncation", "roulette"):
+			raise ValueError("unknown selection " + selection)
+		if isinstance(crossover, str) and crossover not in CROSSOVERS:
+			raise ValueError("unknown crossover " + crossover)
+		if isinstance(mutation, str) and mutation not in MUTATIONS + ("mixed",):
+			raise ValueError("unknown mutation " + mutation)
+
+		self.source = None
+		self.population = None
+		self.control = None
+		self.generation = 0
+		self.stopping = False
+		self.result = None
+		self.locations = locations
+		if distances is not None:
+			self.setDistances(distances)
+
+	# gets a problem ready to solve, skipped if it's the one already loaded
+	def setDistances(self, distances):
+		if distances is self.source:
+			return
+
+		self.source = distances
+		self.distances = openDistances(distances)
+		self.distanceMatrix = toDistanceMatrix(self.distances)
+		self.sizeEntries = self.cities or len(self.distanceMatrix)
+
+		# local search always needs candidate lists, even when the operators aren't using them
+		self.candidates = self.neighbours
+		if self.candidates is None and (self.searchMoves != 0 or self.searchSeconds != 0):
+			self.candidates = getNeighbours(self.distanceMatrix)
+
+	# returns a starting population, random unless members are given, and an empty one to select into
+	def start(self, members=None):
+		if members is None:
+			members = initialize(self.numEntries, self.sizeEntries, self.canonical, self.seeding, self.source, self.locations)
+
+		population = Population(self.distanceMatrix, members, self.canonical, self.numEntries * 3)
+		spare = Population(self.distanceMatrix, canonical=self.canonical, capacity=self.numEntries * 3)
+
+		return population, spare
+
+	def select(self, population, out):
+		if self.selection == "truncation":
+			return truncationSelect(population, self.distanceMatrix, self.numEntries, out)
+		if self.selection == "roulette":
+			return rouletteSelect(population, self.distanceMatrix, self.numEntries, self.sampling, out)
+
+		return self.selection(population, self.distanceMatrix, self.numEntries, out)
+
+	def cross(self, population):
+		if self.crossover == "oc":
+			return ocCrossover(population, self.distances, self.sizeEntries, self.neighbours, self.offspring or 2)
+		if self.crossover in CROSSOVERS and self.offspring:
+			return CROSSOVERS[self.crossover](population, self.distances, self.sizeEntries, self.offspring)
+		if self.crossover in CROSSOVERS:
+			return CROSSOVERS[self.crossover](population, self.distances, self.sizeEntries)
+
+		return self.crossover(population, self.distances, self.sizeEntries)
+
+	def mutate(self, population):
+		if callable(self.mutation):
+			return self.mutation(population, self.mod)
+
+		return mutatePopulation(population, self.mod, self.mutation, self.neighbours)
+
+	# runs one generation: select from population into spare, crossover, mutate and optionally
+	# local search the offspring. returns the new population and the next spare
+	def step(self, population, spare):
+		newPopulation = self.mutate(self.cross(self.select(population, spare)))
+
+		# offspring start after the numEntries selected members
+		if (self.searchMoves != 0 or self.searchSeconds != 0):
+			localSearchStage(newPopulation, self.distanceMatrix, self.candidates, self.numEntries, self.searchMoves, self.searchSeconds)
+
+		return newPopulation, population
+
+	# runs one generation as step does, timing each stage into record. the population is
+	# scored before selection and the offspring after mutation, so the time selection takes
+	# doesn't include working out distances. the record gets:
+	#	"selection", "crossover", "mutation", "search", "evaluation"	- seconds in each stage
+	#	"evaluations"	- the number of members whose distances were worked out in full, by
+	#				  the Population evaluations counts of the populations involved
+	def timedStep(self, population, spare, record):
+		counted = [population, spare]
+		evaluations = sum(each.evaluations for each in counted)
+
+		start = time.time()
+		population.score()
+		evaluation = time.time() - start
+
+		start = time.time()
+		newPopulation = self.select(population, spare)
+		record["selection"] = time.time() - start
+
+		start = time.time()
+		newPopulation = self.cross(newPopulation)
+		record["crossover"] = time.time() - start
+
+		start = time.time()
+		newPopulation = self.mutate(newPopulation)
+		record["mutation"] = time.time() - start
+
+		start = time.time()
+		if (self.searchMoves != 0 or self.searchSeconds != 0):
+			localSearchStage(newPopulation, self.distanceMatrix, self.candidates, self.numEntries, self.searchMoves, self.searchSeconds)
+		record["search"] = time.time() - start
+
+		start = time.time()
+		newPopulation.score()
+		record["evaluation"] = evaluation + time.time() - start
+
+		# a selection function may have made a new population rather than use spare
+		if newPopulation is not population and newPopulation is not spare:
+			counted.append(newPopulation)
+		record["evaluations"] = sum(each.evaluations for each in counted) - evaluations
+
+		return newPopulation, population
+
+	# returns a new AdaptiveControl for a run, kept in self.control, or None if adaptive isn't set
+	def startControl(self):
+		self.control = None
+		if self.adaptive:
+			self.control = AdaptiveControl(self, None if self.adaptive is True else self.adaptive)
+
+		return self.control
+
+	# returns True once the run should stop
+	def finished(self, population, monitor, generation):
+		if self.stopping:
+			return True
+
+		if (self.terminationCondition != 0):
+			if (population.bestLength <= self.terminationCondition):
+				return True
+
+		if monitor.update(population):
+			return True
+
+		return self.termination is not None and self.termination(population, generation)
+
+	# returns the shortest path found so far by the current or last run, its length and the
+	# generation the run is up to, or None before the first generation
+	def best(self):
+		population = self.population
+		if population is None or population.bestTour is None:
+			return None
+
+		return population.bestTour.tolist(), population.bestLength, self.generation
+
+	# asks the current run to stop after the generation it's on
+	def stop(self):
+		self.stopping = True
+
+	# runs the algorithm and returns the shortest path found, its length and the generations
+	# taken, as the TSG_* functions do. distances replaces the loaded problem if given, seed
+	# seeds random and numpy first and members, if given, are the starting population. with
+	# resume set the run carries on from the checkpoint file instead, if there is one. the
+	# final population is kept in self.population
+	def solve(self, distances=None, seed=None, members=None, resume=False):
+		if self.telemetry is None:
+			for record in self.generations(distances, seed, members, False, resume):
+				pass
+
+			return self.result
+
+		report, output = self.telemetry, None
+		if isinstance(report, str):
+			output = open(report, "a")
+			report = lambda record: output.write(json.dumps(record) + "\n")
+
+		try:
+			for record in self.generations(distances, seed, members, True, resume):
+				report(record)
+		finally:
+			if output is not None:
+				output.close()
+
+		return self.result
+
+	# runs the algorithm as solve does, yielding the telemetry record of each generation as
+	# it finishes. the result solve would return is left in self.result at the end
+	def stream(self, distances=None, seed=None, members=None, resume=False):
+		return self.generations(distances, seed, members, True, resume)
+
+	# runs the algorithm one generation at a time, yielding a record of each generation if
+	# timed is set, otherwise None. besides timedStep's stage times, a record holds the
+	# "generation", the "best" distance so far, the "mean" distance of the population, the
+	# "diversity" (edgeEntropy) of the selected members and the "seconds" since the start,
+	# and with adaptive set, the "settings" the generation was run with and its "reward"
+	def generations(self, distances, seed, members, timed, resume=False):
+		if distances is not None:
+			self.setDistances(distances)
+		if seed is not None:
+			random.seed(seed)
+			np.random.seed(seed % 2**32)
+
+		began = time.time()
+		monitor = ConvergenceMonitor(self.patience, self.minDiversity, self.timeLimit, self.numEntries)
+		first = 0
+
+		if resume and self.checkpoint is not None and os.path.exists(self.checkpoint):
+			population, spare, first = self.restoreCheckpoint(monitor)
+		else:
+			population, spare = self.start(members)
+
+		self.population, self.generation, self.stopping = population, first, False
+		gensTaken = max(first - 1, 0)
+		saved = time.time()
+		record = None
+		control = self.startControl()
+
+		try:
+			# loop numGenerations times, select, crossover and mutate the population every iteration
+			for i in range (first, self.numGenerations):
+				gensTaken = i
+
+				if control is not None:
+					control.begin(population)
+
+				if timed:
+					record = {"generation": i}
+					population, spare = self.timedStep(population, spare, record)
+				else:
+					population, spare = self.step(population, spare)
+
+				if control is not None:
+					reward = control.end(population)
+
+				if timed:
+					record["best"] = population.bestLength
+					record["mean"] = float(population.score().mean())
+					record["diversity"] = edgeEntropy(population, self.numEntries)
+					record["seconds"] = time.time() - began
+					if control is not None:
+						record["settings"] = control.current()
+						record["reward"] = reward
+
+				# the offspring are scored so the run is checked against them too
+				population.score()
+				self.population, self.generation = population, i
+				done = self.finished(population, monitor, i)
+
+				if self.checkpoint is not None:
+					if done or i + 1 == self.numGenerations or time.time() - saved >= self.checkpointSeconds:
+						self.saveCheckpoint(population, monitor, i)
+						saved = time.time()
+
+				yield record
+
+				if done:
+					break
+		finally:
+			if control is not None:
+				control.restore()
+
+		self.population = population
+		population.score()
+
+		# finally, take the shortest path found
+		self.result = population.bestTour.tolist(), population.bestLength, gensTaken
+
+	# saves the state of a run to the checkpoint file: the population with its distances,
+	# the best tour, the convergence monitor, both random number generators and the
+	# generation just finished. it's written beside the old file and moved over it, so a
+	# run killed while saving still leaves the last checkpoint whole
+	def saveCheckpoint(self, population, monitor, generation):
+		size = len(population)
+		version, pythonState, gauss = random.getstate()
+		name, numpyState, position, hasGauss, cachedGauss = np.random.get_state()
+
+		temporary = self.checkpoint + ".tmp"
+		with open(temporary, "wb") as output:
+			np.savez_compressed(output,
+				tours=population.tours[:size].astype(tourType(self.sizeEntries)),
+				lengths=population.lengths[:size],
+				scored=population.scored[:size],
+				bestTour=population.bestTour,
+				bestLength=population.bestLength,
+				generation=generation,
+				monitor=np.array([monitor.bestLength, monitor.stale, time.time() - monitor.start]),
+				pythonRandom=np.array(pythonState, dtype=np.int64),
+				pythonRandomVersion=version,
+				pythonGauss=np.nan if gauss is None else gauss,
+				numpyRandom=numpyState,
+				numpyRandomName=name,
+				numpyRandomPosition=position,
+				numpyGauss=np.array([hasGauss, cachedGauss]))
+
+		replaceFile(temporary, self.checkpoint)
+
+	# loads the state saveCheckpoint saved into monitor, random and numpy and returns the
+	# population, a spare one and the generation to carry on from
+	def restoreCheckpoint(self, monitor):
+		with np.load(self.checkpoint) as state:
+			if state["tours"].shape[1] != self.sizeEntries:
+				raise ValueError(self.checkpoint + " is a checkpoint of a different problem")
+
+			population, spare = self.start(state["tours"])
+			scored = state["scored"]
+			population.setScores(np.flatnonzero(scored), state["lengths"][scored])
+			population.bestLength = float(state["bestLength"])
+			population.bestTour = np.array(state["bestTour"], dtype=population.tours.dtype)
+
+			monitor.bestLength, stale, elapsed = state["monitor"]
+			monitor.stale = int(stale)
+			monitor.start = time.time() - elapsed
+
+			gauss = float(state["pythonGauss"])
+			random.setstate((int(state["pythonRandomVersion"]), tuple(int(x) for x in state["pythonRandom"]),
+				None if math.isnan(gauss) else gauss))
+			hasGauss, cachedGauss = state["numpyGauss"]
+			np.random.set_state((str(state["numpyRandomName"]), state["numpyRandom"], int(state["numpyRandomPosition"]),
+				int(hasGauss), float(cachedGauss)))
+
+			return population, spare, int(state["generation"]) + 1
+
+	# solves the problem again after the cities numbered in removed are taken away and cities
+	# at the coordinates in added are put in. only the changed rows and columns of the distances
+	# are worked out (see updateDistances, which also renumbers the cities) and the run carries
+	# on from population, the final one of the last solve if not given, with the removed cities
+	# cut out of its tours and the added ones inserted where they cost least. locations are
+	# the coordinates of the current cities and are kept in self.locations, renumbered, so
+	# they're only needed the first time. the tours are expected to visit every city being
+	# toured, and afterwards every city of the new problem is
+	def resolve(self, removed=(), added=(), population=None, locations=None, seed=None, metric="euclidean"):
+		if population is None:
+			population = self.population
+		if locations is None:
+			locations = self.locations
+		if isinstance(population, Population):
+			population = population.tours[:population.size]
+
+		# only the first sizeEntries cities were being toured, so the others are dropped and
+		# the tours visit every city of the new problem
+		distances = self.distanceMatrix
+		if isinstance(distances, np.ndarray) and self.sizeEntries < len(distances):
+			distances = distances[:self.sizeEntries, :self.sizeEntries]
+			locations = locations[:self.sizeEntries]
+		self.cities = 0
+
+		distances, self.locations, relabel = updateDistances(distances, locations, removed, added, metric)
+		members = patchTours(population, relabel, distances, len(distances) - len(added))
+
+		return self.solve(distances, seed, members)
+
+	# solves each of a list of problems and returns their results in order. seeds is an
+	# optional list of seeds, one per problem. with processes other than 1 the problems
+	# are spread over a pool of that many processes, 0 meaning one per core
+	def solve_many(self, problems, seeds=None, processes=1):
+		if seeds is None:
+			seeds = [None] * len(problems)
+
+		if processes == 1:
+			return [self.solve(problem, seed) for problem, seed in zip(problems, seeds)]
+
+		pool = multiprocessing.Pool(processes or None)
+		try:
+			return pool.map(solveProblem, [(self, problem, seed) for problem, seed in zip(problems, seeds)])
+		finally:
+			pool.close()
+			pool.join()
+
+# moves source over destination in one step, so destination is never left half written
+def replaceFile(source, destination):
+	if hasattr(os, "replace"):
+		os.replace(source, destination)
+	else:
+		os.rename(source, destination)
+
+# solves one problem of GeneticTSPSolver.solve_many in a worker process
+def solveProblem(args):
+	solver, problem, seed = args
+	return solver.solve(problem, seed)
+
+# runs several solvers in lockstep, a generation of each in turn, scoring the new members
+# of all their populations together each generation with scoreStacked. this is for many
+# small problems, where numpy's overhead per call outweighs the work in it. solvers that
+# are adaptive score their own populations too, to reward their settings. seeds is an
+# optional list of seeds, one per solver, and a solver with a seed other than None gets
+# random streams of its own, so it finds what solve(seed=seed) would. the rest share one
+# stream, seeded with seed if it's given. returns what solve would for each solver, in order
+def solveBatch(solvers, seed=None, seeds=None):
+	if seeds is None:
+		seeds = [None] * len(solvers)
+	if seed is not None:
+		random.seed(seed)
+		np.random.seed(seed % 2**32)
+
+	states = [None if own is None else seededStates(own) for own in seeds]
+	runs = []
+	groups = {}
+	for i, solver in enumerate(solvers):
+		if states[i] is not None:
+			shared = swapRandomStates(states[i])
+		population, spare = solver.start()
+		if states[i] is not None:
+			states[i] = swapRandomStates(shared)
+		runs.append([population, spare, ConvergenceMonitor(solver.patience, solver.minDiversity, solver.timeLimit, solver.numEntries),
+			solver.startControl()])
+
+		# matrices of the same size are stacked once so every generation is one gather
+		if isinstance(solver.distanceMatrix, np.ndarray):
+			groups.setdefault((solver.distanceMatrix.shape, solver.sizeEntries), []).append(i)
+	stacks = [(np.stack([solvers[i].distanceMatrix for i in group]), group) for group in groups.values()]
+
+	results = [None] * len(solvers)
+
+	# scores the populations of the runs still going, so a run is checked against its offspring
+	def scoreRunning():
+		for matrices, group in stacks:
+			slots = [slot for slot, i in enumerate(group) if results[i] is None]
+			scoreStacked([runs[group[slot]][0] for slot in slots], matrices, slots)
+
+	scoreRunning()
+	generation = 0
+	while None in results:
+		running = [i for i in range(0, len(solvers)) if results[i] is None]
+
+		for i in running:
+			solver = solvers[i]
+			population, spare, monitor, control = runs[i]
+			if states[i] is not None:
+				shared = swapRandomStates(states[i])
+			if control is not None:
+				control.begin(population)
+			population, spare = solver.step(population, spare)
+			if control is not None:
+				control.end(population)
+			if states[i] is not None:
+				states[i] = swapRandomStates(shared)
+			runs[i][:2] = population, spare
+
+		scoreRunning()
+
+		for i in running:
+			solver = solvers[i]
+			population, spare, monitor, control = runs[i]
+
+			# populations without a stack to be scored in are scored on their own
+			population.score()
+			if generation + 1 >= solver.numGenerations or solver.finished(population, monitor, generation):
+				if control is not None:
+					control.restore()
+				solver.population = population
+				results[i] = population.bestTour.tolist(), population.bestLength, generation
+
+		generation += 1
+
+	return results
+
+# returns the states random and numpy's random would be in once seeded with seed, leaving
+# them as they are
+def seededStates(seed):
+	shared = random.getstate(), np.random.get_state()
+	random.seed(seed)
+	np.random.seed(seed % 2**32)
+
+	return swapRandomStates(shared)
+
+# puts random and numpy's random into states, as returned by seededStates, and returns the
+# states they were in
+def swapRandomStates(states):
+	previous = random.getstate(), np.random.get_state()
+	random.setstate(states[0])
+	np.random.set_state(states[1])
+
+	return previous
+
+# scores the new members of populations in one gather, the distances of each population
+# being the matrix at its slot in matrices, a stack of matrices of the same size. their
+# shortest steps are recorded from the same gather, as Population.score does
+def scoreStacked(populations, matrices, slots):
+	unscored = [np.flatnonzero(~population.scored[:len(population)]) for population in populations]
+	counts = [len(rows) for rows in unscored]
+	if sum(counts) == 0:
+		return
+
+	tours = np.concatenate([population.tours[rows] for population, rows in zip(populations, unscored)])
+	which = np.repeat(slots, counts)[:, None]
+	steps = matrices[which, tours, np.roll(tours, -1, axis=1)]
+	lengths = steps.sum(axis=1)
+	positions, shortest = shortestOfSteps(steps)
+
+	start = 0
+	for population, rows in zip(populations, unscored):
+		end = start + len(rows)
+		population.evaluations += len(rows)
+		population.setScores(rows, lengths[start:end])
+		population.setSteps(rows, positions[start:end], shortest[start:end])
+		start = end
 
-def TSG_Truncation_Twin(numEntries, sizeEntries, distances, numGenerations, terminationCondition, mod):
-	population = initialize(numEntries, sizeEntries)
 
+# main algorithms uses everything else to initialize the population, alter it genertically 
+# over a defined number of iterations and then returns the shortest path it can find
+def TSG_Truncation_OC(numEntries, sizeEntries, distances, numGenerations, terminationCondition, mod, canonical=False, neighbours=None, searchMoves=0, searchSeconds=0, mutation="swap", patience=0, minDiversity=0, timeLimit=0, seeding=None, locations=None, telemetry=None, checkpoint=None, resume=False):
+	return GeneticTSPSolver(distances, numEntries, sizeEntries, "truncation", "oc", mutation, mod, numGenerations,
+		terminationCondition, canonical, neighbours=neighbours, searchMoves=searchMoves, searchSeconds=searchSeconds,
+		patience=patience, minDiversity=minDiversity, timeLimit=timeLimit, seeding=seeding, locations=locations, telemetry=telemetry, checkpoint=checkpoint).solve(resume=resume)
+
+def TSG_Roulette_OC(numEntries, sizeEntries, distances, numGenerations, terminationCondition, mod, canonical=False, sampling="keys", neighbours=None, searchMoves=0, searchSeconds=0, mutation="swap", patience=0, minDiversity=0, timeLimit=0, seeding=None, locations=None, telemetry=None, checkpoint=None, resume=False):
+	return GeneticTSPSolver(distances, numEntries, sizeEntries, "roulette", "oc", mutation, mod, numGenerations,
+		terminationCondition, canonical, sampling, neighbours, searchMoves, searchSeconds,
+		patience, minDiversity, timeLimit, seeding=seeding, locations=locations, telemetry=telemetry, checkpoint=checkpoint).solve(resume=resume)
+
+def TSG_Truncation_Twin(numEntries, sizeEntries, distances, numGenerations, terminationCondition, mod, canonical=False, neighbours=None, searchMoves=0, searchSeconds=0, mutation="swap", patience=0, minDiversity=0, timeLimit=0, seeding=None, locations=None, telemetry=None, checkpoint=None, resume=False):
+	return GeneticTSPSolver(distances, numEntries, sizeEntries, "truncation", "twin", mutation, mod, numGenerations,
+		terminationCondition, canonical, neighbours=neighbours, searchMoves=searchMoves, searchSeconds=searchSeconds,
+		patience=patience, minDiversity=minDiversity, timeLimit=timeLimit, seeding=seeding, locations=locations, telemetry=telemetry, checkpoint=checkpoint).solve(resume=resume)
+
+def TSG_Roulette_Twin(numEntries, sizeEntries, distances, numGenerations, terminationCondition, mod, canonical=False, sampling="keys", neighbours=None, searchMoves=0, searchSeconds=0, mutation="swap", patience=0, minDiversity=0, timeLimit=0, seeding=None, locations=None, telemetry=None, checkpoint=None, resume=False):
+	return GeneticTSPSolver(distances, numEntries, sizeEntries, "roulette", "twin", mutation, mod, numGenerations,
+		terminationCondition, canonical, sampling, neighbours, searchMoves, searchSeconds,
+		patience, minDiversity, timeLimit, seeding=seeding, locations=locations, telemetry=telemetry, checkpoint=checkpoint).solve(resume=resume)
+
+
+# runs numIslands populations in parallel, one process each. every migrationInterval
+# generations each island copies its numMigrants best members into shared memory and
+# takes in the migrants of the island before it in the ring, replacing its worst members.
+# selection and crossover are given as they are to GeneticTSPSolver, and are checked
+# before any island starts. if an island fails the others are stopped and its error raised
+def TSG_Islands(numEntries, sizeEntries, distances, numGenerations, terminationCondition, mod,
+		selection="truncation", crossover="twin", numIslands=0, migrationInterval=50,
+		numMigrants=2, canonical=False, sampling="keys", seed=None):
+	if numIslands == 0:
+		numIslands = multiprocessing.cpu_count()
+	if seed is None:
+		seed = random.randint(0, 2**31 - 1)
+
+	# raises ValueError here for any strategy the islands would fail on
+	GeneticTSPSolver(None, numEntries, sizeEntries, selection, crossover, "swap", mod, numGenerations,
+		terminationCondition, canonical, sampling)
+
+	# a saved distance file is passed on by path so every island maps the same pages
+	if not isinstance(distances, str):
+		distances = toDistanceMatrix(distances)
+
+	# one slot of migrants per island plus the generation it was last written in
+	migrants = multiprocessing.RawArray("i", numIslands * numMigrants * sizeEntries)
+	migrantLengths = multiprocessing.RawArray("d", numIslands * numMigrants)
+	epochs = multiprocessing.RawArray("i", [-1] * numIslands)
+	lock = multiprocessing.Lock()
+
+	# set by the first island to reach terminationCondition so the rest stop too
+	finished = multiprocessing.Value("i", 0)
+	results = multiprocessing.Queue()
+
+	islands = []
+	for island in range(0, numIslands):
+		islands.append(multiprocessing.Process(target=islandWorker, args=(island, numIslands,
+			numEntries, sizeEntries, distances, numGenerations, terminationCondition, mod,
+			selection, crossover, migrationInterval, numMigrants, canonical, sampling, seed + island,
+			migrants, migrantLengths, epochs, lock, finished, results)))
+
+	try:
+		for process in islands:
+			process.start()
+
+		# read every result before joining so no island blocks on a full queue
+		return collectIslands(islands, results)
+	except BaseException:
+		for process in islands:
+			if process.is_alive():
+				process.terminate()
+		raise
+	finally:
+		for process in islands:
+			if process.pid is not None:
+				process.join()
+
+# returns the best result the islands send back, raising the error an island sends
+# instead, or a RuntimeError if one exits without sending anything
+def collectIslands(islands, results):
+	best = None
+	received = 0
+
+	while received < len(islands):
+		try:
+			result = results.get(timeout=1)
+		except Empty:
+			if any(process.exitcode not in (None, 0) for process in islands) or all(
+					process.exitcode is not None for process in islands):
+				raise RuntimeError("an island process exited without sending its result")
+			continue
+
+		if isinstance(result, Exception):
+			raise result
+		received += 1
+		if best is None or result[1] < best[1]:
+			best = result
+
+	return best
+
+# runs one island of TSG_Islands in its own process and sends its result back through
+# results, or the error it failed with so TSG_Islands can raise it rather than wait on it
+def islandWorker(*args):
+	island, results = args[0], args[-1]
+	try:
+		result = runIsland(*args[:-1])
+	except Exception:
+		result = RuntimeError("island " + str(island) + " failed:\n" + traceback.format_exc())
+
+	results.put(result)
+
+# the generation loop of one island in TSG_Islands, returns its best member, distance
+# and generations taken
+def runIsland(island, numIslands, numEntries, sizeEntries, distances, numGenerations,
+		terminationCondition, mod, selection, crossover, migrationInterval, numMigrants,
+		canonical, sampling, seed, migrants, migrantLengths, epochs, lock, finished):
+	# forked islands start with the parent's random state so each one is reseeded
+	random.seed(seed)
+	np.random.seed(seed % 2**32)
+
+	solver = GeneticTSPSolver(distances, numEntries, sizeEntries, selection, crossover, "swap", mod,
+		numGenerations, terminationCondition, canonical, sampling)
+	population, spare = solver.start()
+	gensTaken = 0
 
-	# loop numGenerations times, select, crossover and mutate the population every iteration
 	for i in range (0, numGenerations):
 		gensTaken = i
-		population =	mutate(
-						twinCrossover(
-						truncationSelect(population, distances, numEntries), distances, sizeEntries), mod)
-
-		if (terminationCondition != 0):
-			lowest, lowestIndex = getFittest(population, distances)
-			if (lowest <= terminationCondition):
-				break;
-
+		population, spare = solver.step(population, spare)
+		population.score()
 
-	# finally, take the shortest path in the remaining population 
-	lowest, lowestIndex = getFittest(population, distances)
-	return population[lowestIndex], 1.0/evaluate(population[lowestIndex], distances), gensTaken
-
-def TSG_Roulette_Twin(numEntries, sizeEntries, distances, numGenerations, terminationCondition, mod):
-	population = initialize(numEntries, sizeEntries)
-
-
-	# loop numGenerations times, select, crossover and mutate the population every iteration
-	for i in range (0, numGenerations):
-		gensTaken = i
-		population =	mutate(
-						twinCrossover(
-						rouletteSelect(population, distances, numEntries), distances, sizeEntries), mod)
+		if numIslands > 1 and (i + 1) % migrationInterval == 0:
+			migrate(population, island, numIslands, numMigrants, i, migrants, migrantLengths, epochs, lock)
 
 		if (terminationCondition != 0):
-			lowest, lowestIndex = getFittest(population, distances)
-			if (lowest <= terminationCondition):
-				break;
-
-	# finally, take the shortest path in the remaining population 
-	lowest, lowestIndex = getFittest(population, distances)
-	return population[lowestIndex], 1.0/evaluate(population[lowestIndex], distances), gensTaken
+			if (population.bestLength <= terminationCondition):
+				finished.value = 1
+
+		if finished.value:
+			break
+
+	return population.bestTour.tolist(), population.bestLength, gensTaken
+
+# copies an island's best members into its migration slot and replaces its worst
+# members with the migrants the previous island in the ring last sent
+def migrate(population, island, numIslands, numMigrants, generation, migrants, migrantLengths, epochs, lock):
+	sizeEntries = len(population[0])
+	buffer = np.frombuffer(migrants, dtype=np.int32).reshape(numIslands, numMigrants, sizeEntries)
+	bufferLengths = np.frombuffer(migrantLengths, dtype=np.float64).reshape(numIslands, numMigrants)
+
+	totals = population.score()
+	order = np.argsort(totals, kind="mergesort")
+	source = (island - 1) % numIslands
+
+	with lock:
+		for j, i in enumerate(order[:numMigrants]):
+			buffer[island, j] = population[i]
+			bufferLengths[island, j] = totals[i]
+		epochs[island] = generation
+
+		if epochs[source] < 0:
+			return
+		arrivals = buffer[source].tolist()
+		arrivalLengths = bufferLengths[source].tolist()
+
+	# worst members are replaced first, members already in the population are skipped
+	worst = order[::-1]
+	j = 0
+	for member, length in zip(arrivals, arrivalLengths):
+		if member not in population:
+			population.replace(worst[j], member, length)
+			j += 1
 
 
 #############################################################################################
@@ -634,4 +3197,5 @@ def TSG_Roulette_Twin(numEntries, sizeEntries, distances, numGenerations, termin
 # print testHarness(numEntries, sizeEntries, distances, numGenerations, numTests)
 
 
-testHarness2(200)
\ No newline at end of file
+if __name__ == "__main__":
+	testHarness2(200)
\ No newline at end of file
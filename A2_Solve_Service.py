@@ -0,0 +1,263 @@
+import asyncio
+import json
+import multiprocessing
+import time
+import numpy as np
+
+import A2_Genetic_Salesman as tsp
+
+# an asyncio front end for the genetic algorithm, for calling it from a web server without
+# tying up a thread per solve (needs Python 3.7 or later). small problems arriving close
+# together are solved in one process in lockstep with solveBatch, so their populations
+# are scored together, and large ones get a process each. at most processes processes
+# run at once, each solve can have a deadline and cancelling a solve stops its process
+# once nothing else is waiting on it, e.g.
+#	async with SolveService() as service:
+#		client = InProcessClient(service)
+#		response = await client.solve(locations=cities, deadline=2, options={"crossover": "ox"})
+
+# the GeneticTSPSolver options a request can set
+SOLVER_OPTIONS = ("numEntries", "sizeEntries", "selection", "crossover", "mutation", "mod", "numGenerations",
+	"terminationCondition", "canonical", "sampling", "searchMoves", "searchSeconds", "patience", "minDiversity",
+	"timeLimit", "seeding", "offspring", "adaptive")
+
+# seconds past its deadline a solve has to hand back its best tour before it's stopped
+DEADLINE_GRACE = 1.0
+
+class SolveService(object):
+
+	def __init__(self, processes=0, smallCities=200, batchWindow=0.01, maxBatch=32):
+		self.processes = processes or multiprocessing.cpu_count()
+		self.smallCities = smallCities
+		self.batchWindow = batchWindow
+		self.maxBatch = maxBatch
+		self.slots = None
+		self.pending = []
+		self.flushHandle = None
+		self.tasks = set()
+
+	async def __aenter__(self):
+		self.start()
+		return self
+
+	async def __aexit__(self, *exception):
+		await self.close()
+
+	def start(self):
+		if self.slots is None:
+			self.slots = asyncio.Semaphore(self.processes)
+
+	# cancels every solve still waiting or running and stops their processes
+	async def close(self):
+		if self.flushHandle is not None:
+			self.flushHandle.cancel()
+			self.flushHandle = None
+
+		for problem, expires, future in self.pending:
+			future.cancel()
+		self.pending = []
+
+		tasks = list(self.tasks)
+		for task in tasks:
+			task.cancel()
+		if tasks:
+			await asyncio.wait(tasks)
+
+	# solves a problem given by its distances or by the locations of its cities and returns
+	# the shortest path found, its length and the generations taken, as the TSG_* functions
+	# do. options are GeneticTSPSolver's. deadline is in seconds from now, the run stops by
+	# then with the best it has found, and raises asyncio.TimeoutError if it can't start in
+	# time or doesn't finish within DEADLINE_GRACE of it
+	async def solve(self, distances=None, deadline=0, seed=None, locations=None, **options):
+		self.start()
+		unknown = set(options) - set(SOLVER_OPTIONS)
+		if unknown:
+			raise ValueError("unknown options " + ", ".join(sorted(unknown)))
+
+		cities = len(distances if distances is not None else locations)
+		expires = time.time() + deadline if deadline else 0
+		future = asyncio.get_event_loop().create_future()
+		entry = ((distances, locations, options, seed), expires, future)
+
+		if cities > self.smallCities:
+			self.run(self.solveTogether([entry]))
+		else:
+			self.pending.append(entry)
+			if len(self.pending) >= self.maxBatch:
+				self.flush()
+			elif self.flushHandle is None:
+				self.flushHandle = asyncio.get_event_loop().call_later(self.batchWindow, self.flush)
+
+		return await future
+
+	# serves a request decoded from JSON, as a web tier would receive it:
+	#	{"distances": [[...], ...]} or {"locations": [[x, y], ...]}, and optionally
+	#	"deadline", "seed" and "options", a dict of SOLVER_OPTIONS
+	# and returns {"path": [...], "distance": d, "generations": g} or {"error": message}
+	async def handle(self, request):
+		try:
+			path, distance, gensTaken = await self.solve(request.get("distances"), request.get("deadline") or 0,
+				request.get("seed"), request.get("locations"), **request.get("options", {}))
+		except asyncio.TimeoutError:
+			return {"error": "deadline passed"}
+		except (KeyError, ValueError, TypeError) as error:
+			return {"error": str(error)}
+
+		return {"path": path, "distance": float(distance), "generations": gensTaken}
+
+	def run(self, coroutine):
+		task = asyncio.ensure_future(coroutine)
+		self.tasks.add(task)
+		task.add_done_callback(self.tasks.discard)
+
+	# sends the small problems waiting to be batched off to be solved
+	def flush(self):
+		if self.flushHandle is not None:
+			self.flushHandle.cancel()
+			self.flushHandle = None
+
+		batch, self.pending = self.pending, []
+		if batch:
+			self.run(self.solveTogether(batch))
+
+	# solves a batch of problems in one process once one is free, passing each its
+	# result. the process is stopped if every solve waiting on it is cancelled
+	async def solveTogether(self, batch):
+		async with self.slots:
+			now = time.time()
+			live = []
+			for problem, expires, future in batch:
+				if future.done():
+					continue
+				if expires and expires <= now:
+					future.set_exception(asyncio.TimeoutError("deadline passed before the solve started"))
+				else:
+					live.append((limitTime(problem, expires - now if expires else 0), expires, future))
+
+			if not live:
+				return
+
+			timeout = None
+			if all(expires for problem, expires, future in live):
+				timeout = max(expires for problem, expires, future in live) - now + DEADLINE_GRACE
+
+			futures = [future for problem, expires, future in live]
+			work = asyncio.ensure_future(runInProcess(solveProblems, [problem for problem, expires, future in live], timeout))
+
+			def abandon(future):
+				if all(waiting.done() for waiting in futures):
+					work.cancel()
+
+			for future in futures:
+				future.add_done_callback(abandon)
+
+			try:
+				results = await work
+			except asyncio.CancelledError:
+				for future in futures:
+					future.cancel()
+				raise
+			except Exception as error:
+				for future in futures:
+					if not future.done():
+						future.set_exception(error)
+				return
+
+			for future, result in zip(futures, results):
+				if not future.done():
+					future.set_result(result)
+
+# returns a problem whose run stops within seconds, if seconds isn't 0
+def limitTime(problem, seconds):
+	distances, locations, options, seed = problem
+
+	if seconds:
+		options = dict(options)
+		options["timeLimit"] = min(options.get("timeLimit") or seconds, seconds)
+
+	return distances, locations, options, seed
+
+# solves problems in a worker process, on their own or in lockstep if there's more than one.
+# each problem with a seed gets the result it would on its own
+def solveProblems(problems):
+	solvers = []
+	for distances, locations, options, seed in problems:
+		if distances is None:
+			distances = tsp.getDistances(locations)
+		solvers.append(tsp.GeneticTSPSolver(distances, **options))
+
+	if len(solvers) == 1:
+		return [solvers[0].solve(seed=problems[0][3])]
+
+	return tsp.solveBatch(solvers, seeds=[seed for distances, locations, options, seed in problems])
+
+# runs function(args) in a new process and returns its result, raising what it raised.
+# raises asyncio.TimeoutError if it takes longer than timeout seconds, unless timeout is
+# None. the process is stopped if this is cancelled or times out
+async def runInProcess(function, args, timeout=None):
+	receiver, sender = multiprocessing.Pipe(False)
+	process = multiprocessing.Process(target=sendResult, args=(function, args, sender))
+	process.daemon = True
+	process.start()
+	sender.close()
+
+	try:
+		# a thread waits on the pipe, stopping the process closes it and wakes the thread
+		ready = await asyncio.get_event_loop().run_in_executor(None, receiver.poll, timeout)
+		if not ready:
+			raise asyncio.TimeoutError("solve didn't finish by its deadline")
+
+		try:
+			succeeded, result = receiver.recv()
+		except EOFError:
+			raise RuntimeError("solver process exited with code " + str(process.exitcode))
+
+		if not succeeded:
+			raise result
+		return result
+	finally:
+		if process.is_alive():
+			process.terminate()
+		process.join()
+
+def sendResult(function, args, sender):
+	try:
+		result = (True, function(args))
+	except Exception as error:
+		result = (False, error)
+
+	sender.send(result)
+	sender.close()
+
+# a client that passes requests straight to a SolveService in the same process, through
+# the same JSON a web tier would send and receive, so the service can be used and tested
+# without a network
+class InProcessClient(object):
+
+	def __init__(self, service):
+		self.service = service
+
+	async def solve(self, distances=None, locations=None, deadline=0, seed=None, options=None):
+		request = {"deadline": deadline, "seed": seed, "options": options or {}}
+		if distances is not None:
+			request["distances"] = np.asarray(distances).tolist()
+		if locations is not None:
+			request["locations"] = np.asarray(locations).tolist()
+
+		response = await self.service.handle(json.loads(json.dumps(request)))
+		return json.loads(json.dumps(response))
+
+# solves a few problems of different sizes at once through an InProcessClient
+async def demo():
+	generator = np.random.RandomState(0)
+
+	async with SolveService() as service:
+		client = InProcessClient(service)
+		requests = [client.solve(locations=generator.uniform(0, 100, (n, 2)), deadline=5, seed=i,
+			options={"numEntries": 30, "crossover": "ox", "numGenerations": 200}) for i, n in enumerate([20, 30, 40, 500])]
+
+		for response in await asyncio.gather(*requests):
+			print(response.get("distance"), response.get("generations"), response.get("error"))
+
+if __name__ == "__main__":
+	asyncio.run(demo())
\ No newline at end of file
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# the 8 city Britain problem of testHarness2, whose shortest tour is 1355
+BRITAIN = [
+	[0, 172, 145, 607, 329, 72, 312, 120],
+	[172, 0, 192, 494, 209, 158, 216, 92],
+	[145, 192, 0, 490, 237, 75, 205, 100],
+	[607, 494, 490, 0, 286, 545, 296, 489],
+	[329, 209, 237, 286, 0, 421, 49, 208],
+	[72, 158, 75, 545, 421, 0, 249, 75],
+	[312, 216, 205, 296, 49, 249, 0, 194],
+	[120, 92, 100, 489, 208, 75, 194, 0]]
+
+@pytest.fixture
+def britain():
+	return BRITAIN
+
+@pytest.fixture
+def locations():
+	return np.random.RandomState(0).uniform(0, 100, (60, 2))
@@ -0,0 +1,49 @@
+import numpy as np
+
+import A2_Genetic_Salesman as tsp
+
+def testSymmetricDistancesMatchDense(locations):
+	dense = tsp.getDistances(locations)
+	condensed = tsp.getDistances(locations, symmetric=True)
+	a, b = np.meshgrid(np.arange(60), np.arange(60))
+
+	assert np.allclose(condensed.gather(a, b), dense[a, b])
+	# city numbers from a uint16 tour mustn't overflow the index arithmetic
+	assert np.isclose(condensed.distance(np.uint16(50), np.uint16(59)), dense[50, 59])
+	assert np.isclose(condensed[np.uint16(59), np.uint16(3)], dense[59, 3])
+
+def testCityIndexMatchesBruteForce():
+	locations = np.random.RandomState(1).uniform(0, 1000, (500, 2))
+	index = tsp.CityIndex(locations, 8)
+	dense = tsp.getDistances(locations)
+	np.fill_diagonal(dense, np.inf)
+
+	nearest = np.sort(dense, axis=1)[:, :8]
+	assert np.allclose(index.neighbourDistances, nearest)
+	assert np.allclose(dense[np.arange(500)[:, None], index.neighbours], nearest)
+
+def testSavedDistancesLoadBack(locations, tmpdir):
+	for distances in (tsp.getDistances(locations), tsp.getDistances(locations, symmetric=True)):
+		path = str(tmpdir.join("distances.bin"))
+		tsp.saveDistances(distances, path)
+		loaded = tsp.loadDistances(path)
+		a, b = np.meshgrid(np.arange(60), np.arange(60))
+		assert np.array_equal(tsp.gatherDistances(loaded, a, b), tsp.gatherDistances(tsp.toDistanceMatrix(distances), a, b))
+
+def testCachedDistancesAreForTheSameCities(tmpdir):
+	path = str(tmpdir.join("cache.bin"))
+	first = np.random.RandomState(2).uniform(0, 100, (30, 2))
+	second = np.random.RandomState(3).uniform(0, 100, (30, 2))
+
+	assert np.allclose(tsp.cachedDistances(first, path), tsp.getDistances(first))
+	assert np.allclose(tsp.cachedDistances(second, path), tsp.getDistances(second))
+
+def testUpdateDistancesLeavesTheCallersMatrix(locations):
+	distances = tsp.getDistances(locations)
+	original = distances.copy()
+
+	matrix, cities, relabel = tsp.updateDistances(distances, locations, removed=[3, 7], added=[[1, 1], [2, 2]])
+
+	assert np.array_equal(distances, original)
+	assert np.allclose(matrix, tsp.getDistances(cities))
+	assert (relabel[[3, 7]] == -1).all()
@@ -0,0 +1,74 @@
+import collections
+import random
+
+import numpy as np
+import pytest
+
+import A2_Genetic_Salesman as tsp
+
+def randomPopulation(distances, size, seed, canonical=False):
+	generator = random.Random(seed)
+	n = len(distances)
+	return tsp.Population(distances, [generator.sample(range(n), n) for i in range(size)], canonical)
+
+# the distance and shortest steps kept for every member are what a full pass works out again
+def checkCaches(population, distances):
+	tours = population.tours[:len(population)]
+	assert np.allclose(population.score(), tsp.evaluatePopulation(tours, distances))
+	assert population.bestLength <= population.score().min() + 1e-9
+
+	for i in range(0, len(population)):
+		steps = population.shortestSteps(i)
+		lengths, positions, shortest = tsp.tourStats(tours[i:i + 1], distances)
+		found = tsp.gatherDistances(tsp.toDistanceMatrix(distances), tours[i][steps], tours[i][steps + 1])
+		assert np.allclose(found, shortest[0][:len(steps)])
+
+	keys = collections.Counter(tsp.tourKey(member, population.canonical) for member in tours)
+	assert dict(keys) == population.keys
+
+@pytest.mark.parametrize("symmetric", [False, True])
+def testSwapAndReverseKeepDistances(locations, symmetric):
+	distances = tsp.getDistances(locations, symmetric=symmetric)
+	population = randomPopulation(distances, 10, 1)
+	population.score()
+	generator = random.Random(2)
+
+	for move in range(0, 500):
+		i = generator.randrange(len(population))
+		a, b = sorted(generator.sample(range(len(locations)), 2))
+		if generator.random() < 0.5:
+			population.tour(i).swap(a, b)
+		else:
+			population.tour(i).reverse(a, b)
+
+	checkCaches(population, distances)
+
+@pytest.mark.parametrize("move", ["swap", "inversion", "scramble", "mixed"])
+def testMutatePopulationKeepsDistances(locations, move):
+	distances = tsp.getDistances(locations)
+	population = randomPopulation(distances, 20, 3)
+	population.score()
+	np.random.seed(4)
+
+	for generation in range(0, 20):
+		tsp.mutatePopulation(population, 1, move)
+
+	checkCaches(population, distances)
+
+def testSelectCarriesCaches(locations):
+	distances = tsp.getDistances(locations)
+	population = randomPopulation(distances, 30, 5, canonical=True)
+	out = tsp.truncationSelect(population, distances, 10)
+
+	order = np.argsort(population.score(), kind="mergesort")[:10]
+	assert np.array_equal(out.tours[:10], population.tours[order])
+	checkCaches(out, distances)
+
+def testCompactToursMatchWideOnes(locations):
+	distances = tsp.getDistances(locations)
+	members = [random.Random(i).sample(range(60), 60) for i in range(10)]
+	compact = tsp.Population(distances, members)
+	wide = tsp.Population(distances, members, dtype=np.int64)
+
+	assert compact.tours.dtype == np.uint16
+	assert np.array_equal(compact.score(), wide.score())
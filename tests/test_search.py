@@ -0,0 +1,28 @@
+import random
+
+import numpy as np
+import pytest
+
+import A2_Genetic_Salesman as tsp
+
+@pytest.mark.parametrize("symmetric", [False, True])
+def testLocalSearchChangeMatchesLengths(locations, symmetric):
+	distances = tsp.getDistances(locations, symmetric=symmetric)
+	neighbours = tsp.getNeighbours(distances, 8)
+
+	for seed in range(0, 5):
+		member = random.Random(seed).sample(range(60), 60)
+		improved, change = tsp.localSearch(member, distances, neighbours)
+
+		before, after = tsp.evaluatePopulation([member, improved], distances)
+		assert sorted(improved) == list(range(60))
+		assert change < 0
+		assert np.isclose(after - before, change)
+
+def testShortestStepMatchesAWalk(locations):
+	distances = tsp.getDistances(locations)
+	population = tsp.Population(distances, [random.Random(i).sample(range(60), 60) for i in range(10)])
+	population.score()
+
+	for i in range(0, 10):
+		assert population.shortestStep(i) == tsp.findShortestdistance(population[i].tolist(), distances.tolist())
@@ -0,0 +1,37 @@
+import sys
+
+import numpy as np
+import pytest
+
+import A2_Genetic_Salesman as tsp
+
+pytestmark = pytest.mark.skipif(sys.version_info < (3, 7), reason="the solve service needs asyncio.run")
+
+def testSeededRequestsGetTheirSoloResult():
+	import asyncio
+	import A2_Solve_Service as service
+
+	generator = np.random.RandomState(0)
+	cities = [generator.uniform(0, 100, (n, 2)) for n in (20, 25, 30)]
+	options = {"numEntries": 20, "crossover": "oc", "numGenerations": 30}
+
+	async def solveAll():
+		async with service.SolveService(processes=1) as running:
+			client = service.InProcessClient(running)
+			return await asyncio.gather(*[client.solve(locations=locations, seed=seed, options=options)
+				for seed, locations in enumerate(cities)])
+
+	for seed, (locations, response) in enumerate(zip(cities, asyncio.run(solveAll()))):
+		path, distance, gensTaken = tsp.GeneticTSPSolver(tsp.getDistances(locations), **options).solve(seed=seed)
+		assert response["path"] == path
+		assert np.isclose(response["distance"], distance)
+
+def testBadOptionsAreReported():
+	import asyncio
+	import A2_Solve_Service as service
+
+	async def solve():
+		async with service.SolveService(processes=1) as running:
+			return await running.handle({"distances": [[0, 1], [1, 0]], "options": {"crossover": "bogus"}})
+
+	assert "error" in asyncio.run(solve())
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+import A2_Genetic_Salesman as tsp
+
+def testResumedRunMatchesAnUninterruptedOne(locations, tmpdir):
+	distances = tsp.getDistances(locations)
+	checkpoint = str(tmpdir.join("run.ckpt"))
+	options = {"numEntries": 20, "crossover": "ox", "mutation": "mixed", "mod": 5}
+
+	whole = tsp.GeneticTSPSolver(distances, numGenerations=60, **options).solve(seed=7)
+	tsp.GeneticTSPSolver(distances, numGenerations=25, checkpoint=checkpoint, checkpointSeconds=0, **options).solve(seed=7)
+	resumed = tsp.GeneticTSPSolver(distances, numGenerations=60, checkpoint=checkpoint, **options).solve(seed=99, resume=True)
+
+	assert resumed == whole
+
+def testBatchedSolvesMatchSoloOnes():
+	problems = [tsp.getDistances(np.random.RandomState(seed).uniform(0, 100, (30, 2))) for seed in range(0, 3)]
+
+	def solver(distances):
+		return tsp.GeneticTSPSolver(distances, numEntries=20, crossover="oc", numGenerations=30)
+
+	solo = [solver(distances).solve(seed=seed) for seed, distances in enumerate(problems)]
+	batched = tsp.solveBatch([solver(distances) for distances in problems], seeds=[0, 1, 2])
+
+	assert batched == solo
+
+def testTerminationIsSeenTheGenerationItsMet(britain):
+	for seed in range(0, 10):
+		solver = tsp.GeneticTSPSolver(britain, numEntries=20, numGenerations=200, mod=3)
+		first = None
+		for i, record in enumerate(solver.generations(None, seed, None, False)):
+			if first is None and solver.population.score().min() <= 1355:
+				first = i
+
+		path, distance, gensTaken = tsp.GeneticTSPSolver(britain, numEntries=20, numGenerations=200, mod=3,
+			terminationCondition=1355).solve(seed=seed)
+		if first is not None:
+			assert gensTaken == first
+
+def testResolveKeepsToursWhole(locations):
+	distances = tsp.getDistances(locations)
+	original = distances.copy()
+	solver = tsp.GeneticTSPSolver(distances, numEntries=10, sizeEntries=50, numGenerations=10, locations=locations)
+	solver.solve(seed=1)
+
+	path, distance, gensTaken = solver.resolve(added=[[1, 1], [2, 2]])
+
+	assert sorted(path) == list(range(52))
+	assert np.array_equal(distances, original)
+	assert np.isclose(distance, tsp.evaluatePopulation([path], solver.distanceMatrix)[0])
+
+def testBadStrategiesAreRejected(britain):
+	with pytest.raises(ValueError):
+		tsp.GeneticTSPSolver(britain, crossover="bogus")
+	with pytest.raises(ValueError):
+		tsp.TSG_Islands(20, 8, britain, 10, 0, 3, crossover="bogus", numIslands=2)
+
+def testIslandsFindTheBritainTour(britain):
+	path, distance, gensTaken = tsp.TSG_Islands(20, 8, britain, 200, 1355, 3, numIslands=2, seed=1)
+
+	assert distance == 1355
+	assert sorted(path) == list(range(8))